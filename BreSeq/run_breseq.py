@@ -1,100 +1,179 @@
 #This script should be executed from within a dir contating seperate sub-dirs for each sample (fastq files)
 #Sample sub-dir can contain more than one fastq file that belong to this sample
+#
+#Several samples are run at once: the CPU budget (--cpus) is split between
+#samples that run breseq with --threads threads each. Samples that already
+#have their summary in /SumOfRes are skipped, and the status and timing of
+#every sample is appended to Outputs/manifest.tsv, so an interrupted batch
+#can simply be started again.
 
 import sys, os, shutil, time
+import argparse, multiprocessing, subprocess
 
 
 #True for -p parameters (population mode), fasle for isolated clone mode (ommits -p)
 POP = True
 
-#path to breseq + command
-s = '/home/ronm/breseq-0.27.1-Linux-x86_64/bin/breseq -j 4 '
-
-if POP:
-	s = s + '-p '
+#path to breseq
+BRESEQ = '/home/ronm/breseq-0.27.1-Linux-x86_64/bin/breseq'
 
 #Path to refrences files here
 BWRef = '/home/ronm/NGS/Refs/CP009273_1.gb'
 plasmidRef = '/home/ronm/NGS/Refs/F1_plasmid.gb'
 
-#add refrence files to command
-s = s + '-r %s -r %s -o ' % (BWRef,plasmidRef)
-
 #get current directory
 mypath =  os.getcwd()
 
 #output directory will be /Outputs from current dir
 dest = mypath +'/Outputs'
-
-
-
-print "Analyzing directories in %s... " % mypath
-print 'The output directory will be %s ' % dest
-print '\n'
-
-# go over all .gz files in dir, unzip if required
-allfiles = [ f for f in os.listdir(mypath) if os.path.isfile(os.path.join(mypath,f)) ]
-for f in allfiles:
-    if f.endswith(".gz"):
-        currentdir = mypath+'/'
-        filename = currentdir + f
-        com = 'gunzip -d %s' %filename
-        print 'unzipping %s...\n' % filename
-        os.system(com)
-
-# go over all sub-dirs in current dir
-alldirs = [ f for f in os.listdir(mypath) if os.path.isdir(os.path.join(mypath,f)) ]
-for d in alldirs:
-	real_dir = 0
-	print 'Processing directory %s : ' %d
-	gotopath = mypath+'/'+d
-	os.chdir(gotopath)
+sumdir = mypath + '/SumOfRes'
+manifest = dest + '/manifest.tsv'
+
+MANIFEST_COLUMNS = ['sample', 'status', 'start', 'end', 'seconds', 'returncode']
+
+
+def gunzip_files(path):
+	# go over all .gz files in dir, unzip if required
+	for f in os.listdir(path):
+		filename = os.path.join(path, f)
+		if not (f.endswith(".gz") and os.path.isfile(filename)):
+			continue
+		if os.path.exists(filename[:-3]):
+			print 'skipping %s, it is already unzipped' % filename
+			continue
+		print 'unzipping %s...\n' % filename
+		os.system('gunzip -d %s' % filename)
+
+def find_samples(path):
+	# every sub-dir with at least one fastq file is a sample
+	samples = []
+	for d in sorted(os.listdir(path)):
+		gotopath = os.path.join(path, d)
+		if not os.path.isdir(gotopath):
+			continue
+		fastqs = sorted([f for f in os.listdir(gotopath) if f.endswith(".fastq") and os.path.isfile(os.path.join(gotopath, f))])
+		if fastqs:
+			samples.append((d, fastqs))
+	return samples
+
+def breseq_command(d, fastqs, threads):
+	com = [BRESEQ, '-j', str(threads)]
+	if POP:
+		com.append('-p')
 	#For each sample make its own output sub-dir within /Outputs
-	destpath = dest +'/' + d + ' '
-	#add to command the output destenation after the -o parameter.
-	com = s + destpath
-	# go over all files in sub-dir looking for fastq
-	allfiles = [ f for f in os.listdir(gotopath) if os.path.isfile(os.path.join(gotopath,f)) ]
-	onlyfiles = []
-	for f in allfiles:
-	#if fastq is found, add it to the list of fastq files to be analyzed
-		if f.endswith(".fastq"):
-			real_dir =1
-                	onlyfiles.append(f)
-	com = com + ' '.join(onlyfiles)
-	print com
+	com += ['-r', BWRef, '-r', plasmidRef, '-o', os.path.join(dest, d)]
+	return com + fastqs
+
+def is_done(d):
+	# the summary is copied to /SumOfRes only after breseq finished
+	return os.path.isfile(os.path.join(sumdir, d, d + '.gd'))
+
+def read_manifest():
+	# the last entry of every sample
+	status = {}
+	if os.path.exists(manifest):
+		with open(manifest) as fp:
+			for line in fp:
+				fields = line.rstrip('\n').split('\t')
+				if fields[0] != 'sample':
+					status[fields[0]] = fields[1]
+	return status
+
+def write_manifest_row(row):
+	new = not os.path.exists(manifest)
+	with open(manifest, 'a') as fp:
+		if new:
+			fp.write('\t'.join(MANIFEST_COLUMNS) + '\n')
+		fp.write('\t'.join([str(row[c]) for c in MANIFEST_COLUMNS]) + '\n')
+
+def run_sample(task):
+	d, fastqs, threads = task
+	gotopath = os.path.join(mypath, d)
+	com = breseq_command(d, fastqs, threads)
+	print 'Processing directory %s : %s\n' % (d, ' '.join(com))
+	if not os.path.exists(os.path.join(dest, d)):
+		os.makedirs(os.path.join(dest, d))
+	start = time.time()
+	with open(os.path.join(dest, d, 'breseq.log'), 'w') as log:
+		returncode = subprocess.call(com, cwd=gotopath, stdout=log, stderr=subprocess.STDOUT)
+	end = time.time()
+	return {'sample': d,
+		'status': 'done' if returncode == 0 else 'failed',
+		'start': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start)),
+		'end': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(end)),
+		'seconds': int(end - start),
+		'returncode': returncode}
+
+def collect_summary(d):
+	# copy/rename summary to /SumOfRes dir
+	sourcedir = dest +'/' + d  + '/output'
+	destdir = sumdir + '/' + d + '/'
+
+	if not os.path.exists(destdir):
+		os.makedirs(destdir)
+	src_files = os.listdir(sourcedir)
+	for file_name in src_files:
+		oldFileName = file_name
+		if file_name.endswith(".gd"):
+			newFileName = d + '.gd'
+		elif file_name.startswith("index"):
+			newFileName = d + '.html'
+		else:
+			newFileName = oldFileName
+
+		full_new_file_name = os.path.join(sourcedir, newFileName)
+		full_old_file_name = os.path.join(sourcedir, oldFileName)
+		os.rename(full_old_file_name, full_new_file_name)
+		if (os.path.isfile(full_new_file_name)):
+			shutil.copy(full_new_file_name, destdir)
+
+def main():
+	parser = argparse.ArgumentParser(description='Runs breseq on every sample sub-dir of the current dir')
+	parser.add_argument('--cpus', type=int, default=multiprocessing.cpu_count(), help='the total number of CPUs to use')
+	parser.add_argument('--threads', type=int, default=4, help='the number of breseq threads (-j) per sample')
+	parser.add_argument('--force', action='store_true', help='run samples that are already done, too')
+	args = parser.parse_args()
+
+	print "Analyzing directories in %s... " % mypath
+	print 'The output directory will be %s ' % dest
 	print '\n'
-	#if at least one fastq file was found in this dir --> run com and copy/rename summary to /SumOfRes dir
-	if real_dir :
-		os.system(com)
-		sourcedir = dest +'/' + d  + '/output'
-		destdir = mypath  + '/SumOfRes/' + d + '/'
-
-		if not os.path.exists(destdir):
-	    		os.makedirs(destdir)
-		src_files = os.listdir(sourcedir)
-		for file_name in src_files:
-			oldFileName = file_name
-			if file_name.endswith(".gd"):
-				newFileName = d + '.gd'
-			elif file_name.startswith("index"):
-				newFileName = d + '.html'
-			else:
-				newFileName = oldFileName
-
-			full_new_file_name = os.path.join(sourcedir, newFileName)
-			full_old_file_name = os.path.join(sourcedir, oldFileName)
-			os.rename(full_old_file_name, full_new_file_name)
-	    		if (os.path.isfile(full_new_file_name)):
-				shutil.copy(full_new_file_name, destdir)
-
-
-
-
-
-
-
-
-
-
 
+	gunzip_files(mypath)
+	if not os.path.exists(dest):
+		os.makedirs(dest)
+
+	status = read_manifest()
+	tasks = []
+	for d, fastqs in find_samples(mypath):
+		if is_done(d) and not args.force:
+			print 'skipping %s, its summary is in %s (manifest status: %s)' % (d, sumdir, status.get(d, 'none'))
+			continue
+		tasks.append((d, fastqs, args.threads))
+
+	processes = max(1, min(len(tasks), args.cpus // args.threads))
+	print 'Running %d samples, %d at a time with %d threads each\n' % (len(tasks), processes, args.threads)
+	if not tasks:
+		return
+
+	pool = multiprocessing.Pool(processes)
+	try:
+		for row in pool.imap_unordered(run_sample, tasks):
+			if row['status'] == 'done':
+				try:
+					collect_summary(row['sample'])
+				except (IOError, OSError) as e:
+					print 'could not collect the summary of %s: %s' % (row['sample'], e)
+					row['status'] = 'failed'
+			write_manifest_row(row)
+			print '%s %s after %d seconds\n' % (row['sample'], row['status'], row['seconds'])
+		pool.close()
+	except:
+		# on any error (or an interrupt) the samples that did not finish are
+		# not in the manifest as done, and are run again next time
+		pool.terminate()
+		raise
+	finally:
+		pool.join()
+
+if __name__ == "__main__":
+	main()
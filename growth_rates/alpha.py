@@ -8,7 +8,8 @@ Created on Sun Apr  3 10:24:59 2016
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.optimize.minpack import curve_fit
+from growth_rate import rolling_fit
+from dose_response import fit_curves, exp_decay
 
 file_name = '/home/yinonbaron/Downloads/20160331_pyr_fpyr_mic_full.csv'
 
@@ -24,12 +25,10 @@ x4.ix[:,1:] = x4.ix[:,1:] -x3.iloc[:,blank_wells].as_matrix().mean()
 x4.ix[:,1:] = np.log2(x4.ix[:,1:])
 x5 = x4.iloc[:,~pd.isnull(x4.sum()).as_matrix()]
 #time = x.ix[1:,1:].columns.astype('float')
-e = list()
-for i in x5.columns[1:]:
-    model = pd.ols(y = x5[i],x=x5['index']/3600,window_type='rolling',window=30)
-    e.append(model.beta['x'])
+# rolling fits of all the wells at once (x5 already holds log2 of the OD)
+slopes, intercepts, r2 = rolling_fit(x5['index'].values/3600,x5.iloc[:,1:].values.T.astype('float'),window=30)
     
-t = pd.DataFrame(e,index=x5.columns[1:])
+t = pd.DataFrame(slopes,index=x5.columns[1:])
 mean_slopes = t.iloc[:,:40].transpose().mean()
 mean_slopes = mean_slopes.iloc[:-8].as_matrix()
 result_slopes = mean_slopes.reshape([-1,10])
@@ -40,13 +39,16 @@ plt.errorbar(conc,result_slopes.mean(axis=0)[:-1],result_slopes.std(axis=0)[:-1]
 guess_a, guess_b, guess_c = 0.2, -6, 0.01
 guess = [guess_a, guess_b, guess_c]
 
-exp_decay = lambda x, A, t, y0: A * np.exp(x * t) + y0
+# every row of result_slopes is a replicate of the curve (the last column
+# has no concentration), and all the replicates are fitted together
+curves = pd.DataFrame({'compound': 'fluoropyruvate',
+                       'concentration': np.tile(conc, len(result_slopes)),
+                       'response': result_slopes[:,:-1].ravel()})
+fit = fit_curves(curves, model='exp_decay', p0=guess)
 
-params, cov = curve_fit(exp_decay, conc, result_slopes.mean(axis=0), p0=guess)
+A, t, y0 = fit.loc['fluoropyruvate', ['A', 't', 'y0']]
 
-A, t, y0 = params
-
-best_fit = lambda x: A * np.exp(t * x) + y0
+best_fit = lambda x: exp_decay(x, A, t, y0)
 plt.plot(conc, best_fit(np.array(conc)), 'r')
 plt.xlabel('Fluoropyruvate concentration (mM)')
 plt.ylabel('Growth rate (h^-1)')
\ No newline at end of file
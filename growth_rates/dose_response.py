@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Fits dose-response curves (e.g. growth rate vs. fluoropyruvate) for many
+(strain x compound) combinations at once.
+
+The curves are a long table with one row per measurement: descriptor
+columns that identify the curve (e.g. strain and compound), and the
+columns concentration and response. A layout file maps the wells of a
+plate to these descriptors, see read_layout and wells_to_curves.
+"""
+
+import multiprocessing
+from itertools import imap
+import numpy as np
+import pandas as pd
+from scipy.optimize import curve_fit
+from scipy.stats import t as t_distribution
+
+def exp_decay(x, A, t, y0):
+    return A * np.exp(x * t) + y0
+
+def hill(x, top, bottom, ic50, n):
+    return bottom + (top - bottom) / (1 + np.abs(x / ic50) ** n)
+
+def _first_last(M):
+    # the responses at the lowest and highest measured concentrations
+    valid = ~np.isnan(M)
+    first = np.argmax(valid, axis=1)
+    last = M.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+    rows = np.arange(len(M))
+    return M[rows, first], M[rows, last]
+
+def _half_concentration(c, M, y_first, y_last):
+    # the concentration with the response closest to the midpoint, and the
+    # smallest positive concentration where that is 0
+    distance = np.abs(M - ((y_first + y_last) / 2)[:, np.newaxis])
+    c_half = c[np.argmin(np.where(np.isnan(distance), np.inf, distance), axis=1)]
+    return np.where(c_half > 0, c_half, c[c > 0].min() if (c > 0).any() else 1.0)
+
+def _exp_decay_guess(c, M):
+    y_first, y_last = _first_last(M)
+    c_half = _half_concentration(c, M, y_first, y_last)
+    return np.column_stack([y_first - y_last, -np.log(2) / c_half, y_last])
+
+def _hill_guess(c, M):
+    y_first, y_last = _first_last(M)
+    c_half = _half_concentration(c, M, y_first, y_last)
+    return np.column_stack([y_first, y_last, c_half, np.ones(len(M))])
+
+# model name -> (function, parameter names, initial guesses). The guesses are
+# computed for all the curves at once, from the (curves x concentrations)
+# matrix of mean responses.
+MODELS = {'exp_decay': (exp_decay, ['A', 't', 'y0'], _exp_decay_guess),
+          'hill': (hill, ['top', 'bottom', 'ic50', 'n'], _hill_guess)}
+
+def read_layout(fname):
+    """
+        Reads a layout file: a CSV with a well column, a concentration column
+        and the descriptor columns of the curves (e.g. strain, compound).
+        Wells without a concentration (e.g. blanks) are left out.
+    """
+    layout = pd.read_csv(fname).set_index('well')
+    return layout[layout['concentration'].notnull()]
+
+def wells_to_curves(layout, responses):
+    """
+        Returns the long table of curves, from a layout (see read_layout) and
+        the responses of the wells (a Series or dictionary, e.g. the maximal
+        growth rate of every well)
+    """
+    curves = layout.copy()
+    curves['response'] = pd.Series(responses).reindex(curves.index).values
+    return curves.reset_index(drop=True)
+
+def _fit_task(task):
+    model, x, y, p0, confidence = task
+    function, names, _ = MODELS[model]
+    valid = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[valid], y[valid]
+    nan = np.nan * np.ones(len(names))
+    if len(x) < len(names) or np.isnan(p0).any():
+        return nan, nan, False
+    try:
+        params, cov = curve_fit(function, x, y, p0=p0)
+    except (RuntimeError, ValueError):
+        return nan, nan, False
+    dof = len(x) - len(names)
+    if dof > 0 and np.all(np.isfinite(cov)):
+        half_width = t_distribution.ppf((1 + confidence) / 2., dof) * np.sqrt(np.diag(cov))
+    else:
+        half_width = nan
+    return params, half_width, True
+
+def fit_curves(curves, model='hill', processes=1, confidence=0.95, p0=None):
+    """
+        Fits the model to every curve of the long table.
+
+        processes  - with processes > 1, the curves are fitted across a pool
+                     of worker processes
+        confidence - the level of the confidence intervals, which are based
+                     on the t distribution with n - p degrees of freedom
+        p0         - an initial guess for all the curves, instead of the
+                     guesses of the model
+
+        Returns a table with one row per curve: every parameter with the low
+        and high ends of its confidence interval, the number of points and
+        whether the fit converged (NaN parameters otherwise).
+    """
+    function, names, guess = MODELS[model]
+    keys = [c for c in curves.columns if c not in ('concentration', 'response')]
+    means = curves.groupby(keys + ['concentration'])['response'].mean().unstack('concentration')
+    if p0 is None:
+        guesses = guess(means.columns.values.astype(float), means.values.astype(float))
+    else:
+        guesses = np.tile(np.asarray(p0, dtype=float), (len(means), 1))
+
+    groups = curves.groupby(keys[0] if len(keys) == 1 else keys)
+    points = [groups.get_group(key) for key in means.index]
+    tasks = [(model, g['concentration'].values.astype(float),
+              g['response'].values.astype(float), guesses[i], confidence)
+             for i, g in enumerate(points)]
+
+    if processes > 1:
+        pool = multiprocessing.Pool(processes)
+        map_function = pool.imap
+    else:
+        pool = None
+        map_function = imap
+    try:
+        results = list(map_function(_fit_task, tasks))
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    params = np.array([r[0] for r in results]).reshape(-1, len(names))
+    half_widths = np.array([r[1] for r in results]).reshape(-1, len(names))
+    table = pd.DataFrame(index=means.index)
+    for k, name in enumerate(names):
+        table[name] = params[:, k]
+        table[name + '_low'] = params[:, k] - half_widths[:, k]
+        table[name + '_high'] = params[:, k] + half_widths[:, k]
+    table['n_points'] = [len(g) for g in points]
+    table['converged'] = [r[2] for r in results]
+    return table
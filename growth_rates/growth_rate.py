@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Rolling least-squares fits of log(OD) against time, for all the wells of a
+plate at once, replacing the per-well pd.ols(window_type='rolling') loops.
+
+The readings are arrays with time as their last axis, e.g. (wells x time)
+or (8 x 12 x time); the results have the same leading shape.
+"""
+
+import numpy as np
+
+def to_float(values, over='OVER'):
+    """
+        Converts plate reader values to floats, with saturated readings
+        ('OVER') and empty cells as NaN
+    """
+    values = np.array(values, dtype=object)
+    values[(values == over) | (values == '')] = np.nan
+    return values.astype(float)
+
+def _window_sums(a, window):
+    cs = np.cumsum(a, axis=-1)
+    cs = np.concatenate([np.zeros(cs.shape[:-1] + (1,)), cs], axis=-1)
+    return cs[..., window:] - cs[..., :-window]
+
+def rolling_fit(time, y, window, min_periods=None):
+    """
+        Fits y = intercept + slope * time in every window of window
+        consecutive time points, using only the finite values in the window.
+
+        min_periods - the minimal number of finite values for a fit (by
+                      default the whole window); NaN otherwise
+
+        Returns the slopes, intercepts and r-squared values, arrays of shape
+        y.shape[:-1] + (T - window + 1,), where index j along the last axis
+        is the fit of time points j..j+window-1.
+    """
+    if min_periods is None:
+        min_periods = window
+    time = np.asarray(time, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # the sums are taken over the masked values, with time shifted to the
+    # start, so that the cumulative sums do not lose precision
+    mask = np.isfinite(y) & np.isfinite(time)
+    t0 = time[np.isfinite(time)][0] if np.isfinite(time).any() else 0.0
+    t = np.where(mask, time - t0, 0.0)
+    y = np.where(mask, y, 0.0)
+
+    n = _window_sums(mask.astype(float), window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        st = _window_sums(t, window)
+        sy = _window_sums(y, window)
+        stt = np.maximum(_window_sums(t * t, window) - st * st / n, 0)
+        syy = np.maximum(_window_sums(y * y, window) - sy * sy / n, 0)
+        sty = _window_sums(t * y, window) - st * sy / n
+
+        slopes = sty / stt
+        intercepts = (sy - slopes * st) / n - slopes * t0
+        r2 = np.where(stt * syy == 0, 0.0, sty * sty / (stt * syy))
+
+    invalid = (n < max(min_periods, 2)) | (stt == 0)
+    slopes[invalid] = np.nan
+    intercepts[invalid] = np.nan
+    r2[invalid] = np.nan
+    return slopes, intercepts, np.minimum(r2, 1.0)
+
+def log_od(od, base=np.e):
+    """
+        Returns log(OD), with NaN for saturated and non-positive readings
+    """
+    od = to_float(od) if np.asarray(od).dtype == object else np.asarray(od, dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(od > 0, np.log(od), np.nan) / np.log(base)
+
+def rolling_log_fit(time, od, window, min_periods=None, base=np.e):
+    """
+        rolling_fit of log(OD) (see log_od); the slopes are the growth rates,
+        per unit of time (e.g. h^-1 for time in hours)
+    """
+    return rolling_fit(time, log_od(od, base), window, min_periods)
+
+def _pick(a, index):
+    # a[..., index[...]], i.e. one element of the last axis for every well
+    flat = a.reshape(-1, a.shape[-1])
+    return flat[np.arange(len(flat)), index.ravel()].reshape(index.shape)
+
+def growth_summary(time, od, window, min_periods=None, min_r2=None, base=np.e):
+    """
+        Summarizes the growth curve of every well by its rolling log(OD) fits.
+        If min_r2 is given, only windows that fit at least that well are
+        considered.
+
+        Returns a dictionary of arrays, with the leading shape of od:
+        max_rate    - the maximal growth rate
+        time_of_max - the middle time of the window with the maximal rate
+        r2          - the r-squared of the fit in that window
+        lag_time    - the time at which the tangent of the maximal growth
+                      rate crosses the first log(OD) of the well
+    """
+    time = np.asarray(time, dtype=float)
+    y = log_od(od, base)
+    slopes, intercepts, r2 = rolling_fit(time, y, window, min_periods)
+
+    candidates = np.array(slopes)
+    if min_r2 is not None:
+        candidates[~(r2 >= min_r2)] = np.nan
+    valid = ~np.all(np.isnan(candidates), axis=-1)
+    best = np.zeros(valid.shape, dtype=int)
+    best[valid] = np.nanargmax(candidates[valid], axis=-1)
+
+    def at_best(a):
+        return np.where(valid, _pick(a, best), np.nan)
+
+    max_rate = at_best(slopes)
+    centers = np.convolve(time, np.ones(window) / window, mode='valid')
+
+    # the first finite log(OD) of every well
+    finite = np.isfinite(y)
+    first = np.argmax(finite, axis=-1)
+    y_first = np.where(finite.any(axis=-1), _pick(y, first), np.nan)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        lag_time = (y_first - at_best(intercepts)) / max_rate
+    return {'max_rate': max_rate,
+            'time_of_max': np.where(valid, centers[best], np.nan),
+            'r2': at_best(r2),
+            'lag_time': lag_time}
@@ -0,0 +1,187 @@
+# A compact binary format for the cycles found by johnson_cycles, replacing
+# cycles.txt (one str(list) of names per line, re-parsed with eval).
+#
+# A store is a directory of raw arrays that are memory-mapped when opened:
+#   nodes.int32         - the node IDs of all the cycles, concatenated (the
+#                         first node is not repeated at the end)
+#   offsets.int64       - cycle i is nodes[offsets[i]:offsets[i+1]]
+#   index_ptr.int64     - inverted index, in CSR form: the cycles through
+#   index_cycles.int64    node v are index_cycles[index_ptr[v]:index_ptr[v+1]]
+#   names.txt           - the name of every node ID, one per line
+
+import os
+import ast
+import numpy as np
+from functools import reduce
+
+NODES_FNAME = 'nodes.int32'
+LENGTHS_FNAME = 'lengths.int64'
+OFFSETS_FNAME = 'offsets.int64'
+INDEX_PTR_FNAME = 'index_ptr.int64'
+INDEX_CYCLES_FNAME = 'index_cycles.int64'
+NAMES_FNAME = 'names.txt'
+
+def _map(fname, dtype):
+    # np.memmap cannot map empty files
+    if os.path.getsize(fname) == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(fname, dtype=dtype, mode='r')
+
+class cycle_store_writer(object):
+    """
+        Writes cycles (lists of node IDs) to a store as they are found. Only
+        chunk_size cycles are buffered in memory; the offsets and the inverted
+        index are built when the writer is closed.
+
+        names - the name of every node ID (may also be set or extended before
+                the writer is closed)
+    """
+
+    def __init__(self, dirname, names=None, chunk_size=100000):
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+        self.dirname = dirname
+        self.names = names if names is not None else []
+        self.chunk_size = chunk_size
+        self.n_cycles = 0
+        self._buffer = []
+        self._nodes = open(os.path.join(dirname, NODES_FNAME), 'wb')
+        self._lengths = open(os.path.join(dirname, LENGTHS_FNAME), 'wb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def add(self, cycle):
+        """
+            Adds a cycle, either open or closed (as yielded by simple_cycles,
+            with the first node repeated at the end)
+        """
+        if len(cycle) > 1 and cycle[0] == cycle[-1]:
+            cycle = cycle[:-1]
+        self._buffer.append(cycle)
+        self.n_cycles += 1
+        if len(self._buffer) >= self.chunk_size:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        np.array([len(c) for c in self._buffer], dtype=np.int64).tofile(self._lengths)
+        np.concatenate([np.asarray(c, dtype=np.int32) for c in self._buffer]).tofile(self._nodes)
+        self._buffer = []
+
+    def close(self):
+        self._flush()
+        self._nodes.close()
+        self._lengths.close()
+
+        lengths_fname = os.path.join(self.dirname, LENGTHS_FNAME)
+        lengths = np.array(_map(lengths_fname, np.int64))
+        os.remove(lengths_fname)
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        offsets.tofile(os.path.join(self.dirname, OFFSETS_FNAME))
+
+        # the inverted index: the cycle IDs sorted (stably) by node
+        nodes = _map(os.path.join(self.dirname, NODES_FNAME), np.int32)
+        cycle_ids = np.repeat(np.arange(len(lengths), dtype=np.int64), lengths)
+        cycle_ids[np.argsort(nodes, kind='mergesort')].tofile(
+            os.path.join(self.dirname, INDEX_CYCLES_FNAME))
+        counts = np.bincount(nodes, minlength=len(self.names))
+        np.concatenate([[0], np.cumsum(counts)]).astype(np.int64).tofile(
+            os.path.join(self.dirname, INDEX_PTR_FNAME))
+
+        with open(os.path.join(self.dirname, NAMES_FNAME), 'w') as fp:
+            for name in self.names:
+                fp.write('%s\n' % name)
+
+class cycle_store(object):
+    """
+        Read-only access to a store written by cycle_store_writer. The arrays
+        are memory-mapped, so opening a store does not read the cycles, and
+        queries return arrays of cycle IDs that can be intersected cheaply.
+    """
+
+    def __init__(self, dirname):
+        self.dirname = dirname
+        with open(os.path.join(dirname, NAMES_FNAME)) as fp:
+            self.names = [line.rstrip('\n') for line in fp]
+        self.name_index = dict([(name, i) for i, name in enumerate(self.names)])
+        self.nodes = _map(os.path.join(dirname, NODES_FNAME), np.int32)
+        self.offsets = _map(os.path.join(dirname, OFFSETS_FNAME), np.int64)
+        self.index_ptr = _map(os.path.join(dirname, INDEX_PTR_FNAME), np.int64)
+        self.index_cycles = _map(os.path.join(dirname, INDEX_CYCLES_FNAME), np.int64)
+        self.lengths = np.diff(self.offsets)
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def __iter__(self):
+        for i in xrange(len(self)):
+            yield self.cycle_names(i)
+
+    def _node(self, node):
+        if isinstance(node, (int, long, np.integer)):
+            return node
+        return self.name_index[node]
+
+    def cycle(self, i):
+        """
+            Returns the node IDs of cycle i
+        """
+        return np.asarray(self.nodes[self.offsets[i]:self.offsets[i+1]])
+
+    def cycle_names(self, i):
+        return [self.names[v] for v in self.cycle(i)]
+
+    def through(self, node):
+        """
+            Returns the (sorted) IDs of the cycles through the node, given as
+            an ID or a name
+        """
+        v = self._node(node)
+        if v >= len(self.index_ptr) - 1:
+            return np.zeros(0, dtype=np.int64)
+        return np.asarray(self.index_cycles[self.index_ptr[v]:self.index_ptr[v+1]])
+
+    def through_all(self, nodes):
+        """
+            Returns the IDs of the cycles through all the given nodes (all
+            the cycle IDs when no nodes are given)
+        """
+        nodes = list(nodes)
+        if not nodes:
+            return np.arange(len(self), dtype=np.int64)
+        return reduce(lambda a, b: np.intersect1d(a, b, assume_unique=True),
+                      [self.through(v) for v in nodes])
+
+    def of_length(self, length):
+        """
+            Returns the IDs of the cycles with the given number of nodes
+        """
+        return np.flatnonzero(self.lengths == length)
+
+def convert_text_cycles(fname, dirname):
+    """
+        Converts a legacy cycles.txt file (one Python list of node names per
+        line) to a store, numbering the names in order of appearance.
+
+        Returns the number of cycles converted.
+    """
+    names = []
+    name_index = {}
+    with cycle_store_writer(dirname, names) as writer:
+        with open(fname) as fp:
+            for line in fp:
+                if not line.strip():
+                    continue
+                cycle = []
+                for name in ast.literal_eval(line):
+                    if name not in name_index:
+                        name_index[name] = len(names)
+                        names.append(name)
+                    cycle.append(name_index[name])
+                writer.add(cycle)
+        return writer.n_cycles
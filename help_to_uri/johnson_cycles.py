@@ -0,0 +1,263 @@
+# Johnson's algorithm for finding all the elementary cycles of a directed graph
+# (D. B. Johnson, SIAM J. Comput. 4(1), 1975), written with explicit stacks
+# instead of recursion, so that it works on graphs as large as the bipartite
+# metabolite/reaction graph of iJO1366.
+
+import heapq
+import multiprocessing
+from collections import defaultdict, deque
+from itertools import imap
+
+def adjacency(n,E):
+    adj = {}
+    for i in range(n):
+        adj[i]=set()
+    for (s,t) in E:
+        adj[s].add(t)
+    return adj
+
+def induced(vs,E):
+    vs = set(vs)
+    rc = {}
+    for i in vs:
+        rc[i]=set([x for x in E[i] if x in vs])
+    return rc
+
+def strongly_connected_components(E, vertices=None):
+    """
+        Tarjan's algorithm, iteratively. E is an adjacency dictionary (see
+        adjacency) and vertices the order in which roots are tried.
+        Returns a list of components (lists of vertices).
+    """
+    if vertices is None:
+        vertices = sorted(E)
+    index = {}
+    lowlink = {}
+    S = []
+    on_S = set()
+    components = []
+    for root in vertices:
+        if root in index:
+            continue
+        index[root] = lowlink[root] = len(index)
+        S.append(root)
+        on_S.add(root)
+        work = [(root, iter(E[root]))]
+        while work:
+            v, neighbors = work[-1]
+            for w in neighbors:
+                if w not in index:
+                    index[w] = lowlink[w] = len(index)
+                    S.append(w)
+                    on_S.add(w)
+                    work.append((w, iter(E[w])))
+                    break
+                elif w in on_S:
+                    lowlink[v] = min(lowlink[v], index[w])
+            else:
+                # all the neighbors of v were visited
+                work.pop()
+                if work:
+                    u = work[-1][0]
+                    lowlink[u] = min(lowlink[u], lowlink[v])
+                if lowlink[v] == index[v]:
+                    component = []
+                    while True:
+                        w = S.pop()
+                        on_S.remove(w)
+                        component.append(w)
+                        if w == v:
+                            break
+                    components.append(component)
+    return components
+
+def _unblock(v, blocked, B):
+    stack = [v]
+    while stack:
+        u = stack.pop()
+        if u in blocked:
+            blocked.remove(u)
+            stack.extend(B[u])
+            B[u].clear()
+
+def circuits(s, Ak):
+    """
+        Yields all the elementary cycles through s in the subgraph Ak (an
+        adjacency dictionary), where s is the smallest vertex of the subgraph.
+        Each cycle is a list of vertices that starts and ends with s.
+    """
+    path = [s]
+    blocked = set([s])
+    B = defaultdict(set)
+    closed = set()
+    stack = [(s, list(Ak[s]))]
+    while stack:
+        v, neighbors = stack[-1]
+        if neighbors:
+            w = neighbors.pop()
+            if w == s:
+                yield path + [s]
+                closed.update(path)
+            elif w not in blocked:
+                path.append(w)
+                stack.append((w, list(Ak[w])))
+                closed.discard(w)
+                blocked.add(w)
+                continue
+        if not neighbors:
+            # done with v: unblock it if it lies on a cycle, otherwise wait
+            # until one of its neighbors gets unblocked
+            if v in closed:
+                _unblock(v, blocked, B)
+            else:
+                for w in Ak[v]:
+                    B[w].add(v)
+            stack.pop()
+            path.pop()
+
+def bounded_circuits(s, Ak, max_length):
+    """
+        Same as circuits, but only for cycles of at most max_length vertices.
+
+        Johnson's blocking is not valid when the length is bounded, so this is
+        a plain depth-first search, pruned by the distance of every vertex
+        back to s: a vertex is entered only if the shortest way back from it
+        still fits within max_length.
+    """
+    # BFS over the reversed edges, for the distance from every vertex to s
+    reverse = defaultdict(list)
+    for v in Ak:
+        for w in Ak[v]:
+            reverse[w].append(v)
+    dist = {s: 0}
+    queue = deque([s])
+    while queue:
+        w = queue.popleft()
+        for v in reverse[w]:
+            if v not in dist:
+                dist[v] = dist[w] + 1
+                queue.append(v)
+
+    path = [s]
+    on_path = set([s])
+    stack = [iter(Ak[s])]
+    while stack:
+        for w in stack[-1]:
+            if w == s:
+                yield path + [s]
+            elif w not in on_path and w in dist and len(path) + dist[w] <= max_length:
+                path.append(w)
+                on_path.add(w)
+                stack.append(iter(Ak[w]))
+                break
+        else:
+            stack.pop()
+            on_path.remove(path.pop())
+
+def _without(n,E,excluded):
+    return adjacency(n,[(s,t) for (s,t) in E if s not in excluded and t not in excluded])
+
+def _reachable(s, A):
+    seen = set([s])
+    stack = [s]
+    while stack:
+        for w in A[stack.pop()]:
+            if w not in seen:
+                seen.add(w)
+                stack.append(w)
+    return seen
+
+def start_vertex_cycles(s, component, E, max_length=None):
+    """
+        Returns all the elementary cycles whose smallest vertex is s, where s
+        belongs to the strongly connected component (a list of vertices) of
+        the graph E (an adjacency dictionary).
+
+        These cycles lie in the part of the component that is both reachable
+        from s and reaches s, using only vertices >= s, so every start vertex
+        can be handled independently of the others.
+    """
+    A = induced([v for v in component if v >= s],E)
+    reverse = defaultdict(set)
+    for v in A:
+        for w in A[v]:
+            reverse[w].add(v)
+    Ak = induced(_reachable(s,A) & _reachable(s,reverse),A)
+    if max_length is None:
+        return list(circuits(s, Ak))
+    return list(bounded_circuits(s, Ak, max_length))
+
+_worker_graph = None
+
+def _init_worker(E, components, max_length):
+    global _worker_graph
+    _worker_graph = (E, components, max_length)
+
+def _cycles_task(task):
+    s, k = task
+    E, components, max_length = _worker_graph
+    return start_vertex_cycles(s, components[k], E, max_length)
+
+def parallel_simple_cycles(n,E,processes=1,max_length=None,excluded=()):
+    """
+        Same as simple_cycles, but the graph is decomposed into strongly
+        connected components only once, and the start vertices are farmed
+        out to a pool of worker processes (see start_vertex_cycles). Most of
+        the work is in a few large components, and their start vertices are
+        independent tasks.
+
+        The cycles are yielded in the order of simple_cycles (by smallest
+        vertex). Every cycle is found only by the task of its smallest vertex,
+        so no cycles need to be kept to avoid duplicates.
+    """
+    E = _without(n,E,set(excluded))
+    components = [c for c in strongly_connected_components(E)
+                  if len(c) > 1 or c[0] in E[c[0]]]
+    tasks = sorted((s, k) for k, c in enumerate(components) for s in c)
+
+    if processes > 1:
+        pool = multiprocessing.Pool(processes, initializer=_init_worker,
+                                    initargs=(E, components, max_length))
+        map_function = pool.imap
+    else:
+        pool = None
+        _init_worker(E, components, max_length)
+        map_function = imap
+
+    try:
+        for cycles in map_function(_cycles_task, tasks):
+            for cycle in cycles:
+                yield cycle
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+def simple_cycles(n,E,max_length=None,excluded=()):
+    """
+        Yields all the elementary cycles of the graph with vertices 0..n-1 and
+        the directed edges E, ordered by their smallest vertex. Each cycle is
+        a list of vertices starting and ending with its smallest vertex.
+
+        max_length - if given, only cycles with at most this many vertices
+                     are searched for (longer branches are never explored)
+        excluded   - vertices that are removed from the graph up front, so
+                     no cycle goes through them
+    """
+    excluded = set(excluded)
+    E = _without(n,E,excluded)
+    # strongly connected components that may contain cycles, by smallest vertex
+    heap = []
+    def push_components(vs):
+        for c in strongly_connected_components(induced(vs,E), sorted(vs)):
+            if len(c) > 1 or c[0] in E[c[0]]:
+                heapq.heappush(heap, (min(c), c))
+    push_components([v for v in range(n) if v not in excluded])
+    while heap:
+        s, component = heapq.heappop(heap)
+        if max_length is None:
+            cycles = circuits(s, induced(component,E))
+        else:
+            cycles = bounded_circuits(s, induced(component,E), max_length)
+        for cycle in cycles:
+            yield cycle
+        push_components([v for v in component if v != s])
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+A plate container shared by the plate reader analyses (growth_rates,
+pyr_trans, prs assay).
+
+The readings are one float32 array of shape (rows x cols x channels x time),
+e.g. (8 x 12 x 2 x T) for OD and fluorescence on a 96 well plate, with the
+time axis and an optional well label map alongside. Reader exports are
+parsed once, and later loads memory-map the binary cache instead. Being
+float32, the cached readings match the export to about 1e-6 (relative),
+well below the precision of the reader.
+"""
+
+import csv
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import numpy as np
+
+WELL_PATTERN = re.compile(r'^([A-P])(\d{1,2})$')
+TIME_LABEL = 'Time [s]'
+CACHE_DIR = 'plate_cache'
+
+def well_position(well):
+    """
+        Returns the (row, col) of a well ID such as 'B7' -> (1, 6)
+    """
+    match = WELL_PATTERN.match(well.strip())
+    return ord(match.group(1)) - ord('A'), int(match.group(2)) - 1
+
+def well_name(row, col):
+    return '%s%d' % (chr(ord('A') + row), col + 1)
+
+def _to_float(cells):
+    values = []
+    for cell in cells:
+        try:
+            values.append(float(cell))
+        except ValueError:
+            # 'OVER' (saturated) and empty cells
+            values.append(np.nan)
+    return values
+
+class plate(object):
+    """
+        data     - float32 array of shape (rows x cols x channels x time)
+        time     - the time points (in seconds for reader exports)
+        channels - the names of the channels, e.g. ['OD600', 'GFP']
+        labels   - (rows x cols) object array of the well labels, or None
+    """
+
+    def __init__(self, data, time, channels, labels=None):
+        self.data = data
+        self.time = np.asarray(time, dtype=float)
+        self.channels = list(channels)
+        self.labels = labels
+
+    @classmethod
+    def from_channels(cls, channels, arrays, time, shape=(8, 12)):
+        """
+            Creates a plate from one (wells x time) array per channel, with
+            the wells in row-major order (A1, A2, ..., B1, ...)
+        """
+        arrays = [np.asarray(a, dtype=np.float32).reshape(shape + (-1,)) for a in arrays]
+        return cls(np.stack(arrays, axis=2), time, channels)
+
+    @property
+    def shape(self):
+        return self.data.shape[:2]
+
+    def _channel_index(self, channel):
+        if isinstance(channel, basestring):
+            return self.channels.index(channel)
+        return channel
+
+    def channel(self, channel=0):
+        """
+            Returns the (rows x cols x time) readings of a channel, given by
+            its name or index
+        """
+        return self.data[:, :, self._channel_index(channel), :]
+
+    def wells(self, channel=0):
+        """
+            Returns the readings of a channel as a (wells x time) array, in
+            row-major order
+        """
+        return self.channel(channel).reshape(-1, len(self.time))
+
+    def well(self, well, channel=0):
+        row, col = well_position(well)
+        return self.data[row, col, self._channel_index(channel), :]
+
+    def set_labels(self, labels):
+        """
+            Sets the well labels from a dictionary of well ID -> label
+        """
+        self.labels = np.empty(self.shape, dtype=object)
+        for well, label in labels.iteritems():
+            self.labels[well_position(well)] = label
+
+    def find_wells(self, label):
+        """
+            Returns the (row, col) positions of the wells with the label
+        """
+        rows, cols = np.nonzero(self.labels == label)
+        return zip(rows, cols)
+
+    def save(self, dirname):
+        if not os.path.exists(dirname):
+            os.makedirs(dirname)
+        np.save(os.path.join(dirname, 'data.npy'), np.asarray(self.data, dtype=np.float32))
+        np.save(os.path.join(dirname, 'time.npy'), self.time)
+        with open(os.path.join(dirname, 'channels.txt'), 'w') as fp:
+            for name in self.channels:
+                fp.write('%s\n' % name)
+        if self.labels is not None:
+            with open(os.path.join(dirname, 'labels.txt'), 'w') as fp:
+                for (row, col), label in np.ndenumerate(self.labels):
+                    if label is not None:
+                        fp.write('%s\t%s\n' % (well_name(row, col), label))
+
+    @classmethod
+    def load(cls, dirname, mmap_mode='r'):
+        """
+            Loads a saved plate, memory-mapping the readings (unless
+            mmap_mode is None)
+        """
+        data = np.load(os.path.join(dirname, 'data.npy'), mmap_mode=mmap_mode)
+        time = np.load(os.path.join(dirname, 'time.npy'))
+        with open(os.path.join(dirname, 'channels.txt')) as fp:
+            channels = [line.rstrip('\n') for line in fp]
+        p = cls(data, time, channels)
+        labels_fname = os.path.join(dirname, 'labels.txt')
+        if os.path.exists(labels_fname):
+            with open(labels_fname) as fp:
+                p.set_labels(dict(line.rstrip('\n').split('\t', 1) for line in fp))
+        return p
+
+def parse_tecan(fname):
+    """
+        Parses a Tecan reader export (CSV). Every channel is a block with a
+        'Time [s]' row followed by one row per well; the name of the channel
+        is taken from the last single-cell row before it (e.g. 'OD600').
+        Exports with the wells as columns are transposed first. Saturated
+        readings ('OVER') become NaN.
+    """
+    with open(fname) as fp:
+        rows = [[cell.strip() for cell in row] for row in csv.reader(fp)]
+    if not any(row and row[0] == TIME_LABEL for row in rows):
+        width = max(len(row) for row in rows)
+        rows = map(list, zip(*[row + [''] * (width - len(row)) for row in rows]))
+
+    channels = []
+    name = None
+    for row in rows:
+        if not row or not row[0]:
+            continue
+        if row[0] == TIME_LABEL:
+            time = _to_float(row[1:])
+            while time and np.isnan(time[-1]):
+                time.pop()
+            channels.append((name or 'channel%d' % len(channels), time, {}))
+        elif WELL_PATTERN.match(row[0]) and channels:
+            channels[-1][2][row[0]] = _to_float(row[1:len(channels[-1][1]) + 1])
+        elif not any(row[1:]):
+            name = row[0].replace('Label:', '').strip()
+
+    # the plate size is the smallest standard one that holds all the wells
+    positions = [well_position(w) for _, _, wells in channels for w in wells]
+    large = any(r >= 8 or c >= 12 for r, c in positions)
+    shape = (16, 24) if large else (8, 12)
+
+    n_times = min(len(time) for _, time, _ in channels)
+    data = np.full(shape + (len(channels), n_times), np.nan, dtype=np.float32)
+    for k, (_, _, wells) in enumerate(channels):
+        for well, values in wells.iteritems():
+            row, col = well_position(well)
+            data[row, col, k, :len(values[:n_times])] = values[:n_times]
+    return plate(data, channels[0][1][:n_times], [c[0] for c in channels])
+
+def _file_hash(fname):
+    sha = hashlib.sha1()
+    with open(fname, 'rb') as fp:
+        for block in iter(lambda: fp.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+def load_plate(fname, cache_dir=None):
+    """
+        Returns the plate of a reader export, parsing it only the first time:
+        the plate is then saved to cache_dir (by default, plate_cache next to
+        the export) under the hash of the file, and memory-mapped from there.
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(fname)), CACHE_DIR)
+    cached = os.path.join(cache_dir, '%s.%s' % (os.path.basename(fname), _file_hash(fname)))
+    if not os.path.exists(cached):
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        # written to a temporary directory first, so that an interrupted
+        # parse never leaves a partial cache behind
+        tmp = tempfile.mkdtemp(dir=cache_dir)
+        try:
+            parse_tecan(fname).save(tmp)
+            os.rename(tmp, cached)
+        except:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+    return plate.load(cached)
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Reporter activity from plate tensors: blank subtraction, fluorescence/OD
+normalization and the activity of sample wells relative to positive and
+negative reference wells, for all the assays of a plate in one pass.
+"""
+
+import csv
+import numpy as np
+from plate import well_position
+
+class reporter_layout(object):
+    """
+        The wells of a set of reporter assays. Assay i compares the sample
+        well samples[i] to the reference wells positives[i] and negatives[i],
+        after subtracting the readings of the blank well blanks[i] from all
+        three.
+
+        The wells are given as IDs (e.g. 'B11'), and kept as (rows, cols)
+        index arrays for every role.
+    """
+
+    ROLES = ('sample', 'positive', 'negative', 'blank')
+
+    def __init__(self, samples, positives, negatives, blanks, names=None):
+        self.wells = dict(zip(self.ROLES, [samples, positives, negatives, blanks]))
+        if len(set(map(len, self.wells.values()))) != 1:
+            raise ValueError('every assay needs a sample, positive, negative and blank well')
+        self.names = list(names) if names is not None else list(samples)
+        self.index = {}
+        for role, wells in self.wells.iteritems():
+            positions = np.array([well_position(w) for w in wells], dtype=int).reshape(-1, 2)
+            self.index[role] = (positions[:, 0], positions[:, 1])
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def read(cls, fname):
+        """
+            Reads a layout file: a CSV with the columns sample, positive,
+            negative and blank (well IDs), and optionally name
+        """
+        with open(fname) as fp:
+            rows = list(csv.DictReader(fp))
+        names = [r['name'] for r in rows] if rows and 'name' in rows[0] else None
+        return cls(*[[r[role].strip() for r in rows] for role in cls.ROLES], names=names)
+
+    def take(self, readings, role):
+        """
+            Returns the (assays x time) readings of the wells with the role,
+            from a (rows x cols x time) array
+        """
+        rows, cols = self.index[role]
+        return np.asarray(readings, dtype=float)[rows, cols, :]
+
+def reporter_activity(od, fluorescence, layout, average_blank=True):
+    """
+        Computes the normalized activity of every assay of the layout, from
+        the (rows x cols x time) OD and fluorescence readings.
+
+        Every well is blank subtracted (by the time average of its blank well,
+        or point by point if average_blank is False) and its fluorescence
+        normalized by its OD. The activity of an assay is then
+        (sample - negative) / (positive - negative).
+
+        Returns the activity and the blank subtracted OD of the samples, two
+        (assays x time) arrays.
+    """
+    def blank(readings):
+        b = layout.take(readings, 'blank')
+        return b.mean(axis=1)[:, np.newaxis] if average_blank else b
+
+    od_blank = blank(od)
+    f_blank = blank(fluorescence)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        normalized = dict([(role, (layout.take(fluorescence, role) - f_blank) /
+                                  (layout.take(od, role) - od_blank))
+                           for role in ('sample', 'positive', 'negative')])
+        activity = ((normalized['sample'] - normalized['negative']) /
+                    (normalized['positive'] - normalized['negative']))
+    return activity, layout.take(od, 'sample') - od_blank
+
+def od_gated_mean(values, od, od_range=(0.1, 0.2)):
+    """
+        Averages values over the time points where od is strictly within
+        od_range, ignoring NaN, for every row of the (assays x time) arrays.
+        NaN where no time point qualifies.
+    """
+    values = np.asarray(values, dtype=float)
+    od = np.asarray(od, dtype=float)
+    gate = (od > od_range[0]) & (od < od_range[1]) & ~np.isnan(values)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(gate, values, 0).sum(axis=-1) / gate.sum(axis=-1)
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of plate, run with pytest from this directory.
+"""
+
+import os
+import numpy as np
+from plate import load_plate
+
+EXPORT = ['OD600',
+          'Time [s],0,600,1200',
+          'A1,0.1234567,0.2345678,OVER',
+          'B2,1.0000001,3.14159265,0.0001',
+          '',
+          'GFP',
+          'Time [s],0,600,1200',
+          'A1,12345.678,23456.789,34567.891',
+          'B2,1,2,3']
+
+def test_load_plate_round_trip(tmpdir):
+    fname = os.path.join(str(tmpdir), 'export.csv')
+    with open(fname, 'w') as fp:
+        fp.write('\n'.join(EXPORT) + '\n')
+
+    # the first load parses the export and writes the cache, the second one
+    # memory-maps the cache
+    for _ in range(2):
+        p = load_plate(fname)
+        assert p.channels == ['OD600', 'GFP']
+        assert np.array_equal(p.time, [0, 600, 1200])
+        # the readings are stored as float32, so they only match the export
+        # to float32 precision; the tolerance is deliberate
+        np.testing.assert_allclose(p.well('A1', 'OD600'), [0.1234567, 0.2345678, np.nan], rtol=1e-6)
+        np.testing.assert_allclose(p.well('B2', 'OD600'), [1.0000001, 3.14159265, 0.0001], rtol=1e-6)
+        np.testing.assert_allclose(p.well('A1', 'GFP'), [12345.678, 23456.789, 34567.891], rtol=1e-6)
+        np.testing.assert_allclose(p.well('B2', 'GFP'), [1, 2, 3], rtol=1e-6)
+        assert np.isnan(p.well('C3')).all()
+    assert len(os.listdir(os.path.join(str(tmpdir), 'plate_cache'))) == 1
@@ -3,6 +3,10 @@ import tkFileDialog
 import pandas as pd
 import csv,re
 import scipy.stats as st
+import os,sys
+sys.path.insert(0, '../core_analysis')
+from sliding_window import window_regression
+from plate_ingest import find_plates, read_plate
 
 def num(s):
     if s:
@@ -32,34 +36,33 @@ def findi(s,df):
     return list_of_indexs
 
 
-root = Tk()
-root.withdraw()
-data_file = tkFileDialog.askopenfile(initialdir='/home/yinonbaron/Documents/Experiments')
-map_file = tkFileDialog.askopenfile(initialdir='/home/yinonbaron/Documents/Experiments')
+# plates are given on the command line as directories or globs of
+# assay_<plate>.csv/map_<plate>.csv pairs, or else picked in a dialog
+if len(sys.argv) > 1:
+    plates = find_plates(sys.argv[1:])
+else:
+    root = Tk()
+    root.withdraw()
+    data_file = tkFileDialog.askopenfile(initialdir='/home/yinonbaron/Documents/Experiments')
+    map_file = tkFileDialog.askopenfile(initialdir='/home/yinonbaron/Documents/Experiments')
+    plates = [(os.path.basename(data_file.name), data_file.name, map_file.name)]
 
-data = pd.DataFrame.from_csv(data_file,index_col=0)
-map_df = pd.DataFrame.from_csv(map_file,index_col=0)
-time = data.loc[data.index[0]]
-data = data.loc[data.index[2:]]
+window_size = 10
+slopes_dfs = {}
+rvalue_dfs = {}
+plate_rates = {}
+for plate, data_fname, map_fname in plates:
+    time, data = read_plate(data_fname, map_fname)
 
-for i in data.index:
-    row = i[0]
-    col = i[1:]
-    data.loc[i,'label'] = map_df.loc[int(col),row]
-data.set_index('label', inplace = True)
+    norm_data = data.subtract(data.icol(0),axis=0)
 
-norm_data = data.subtract(data.icol(0),axis=0)
+    slopes, rsquared = window_regression(time,norm_data.values,window_size)
 
-window_size = 10
-slopes = np.empty([len(norm_data.index),len(data.columns)-10+1])
-rsquared = np.empty([len(norm_data.index),len(data.columns)-10+1])
-for x,i in enumerate(norm_data.index):
-    for j in range(0,len(data.columns)-10+1):
-        res = st.linregress(time[j:j+window_size],norm_data.loc[i][j:j+window_size])
-        slopes[x,j] = res.slope
-        rsquared[x,j] = res.rvalue
+    slopes_df = pd.DataFrame(slopes,index = norm_data.index)
+    rvalue_df = pd.DataFrame(rsquared,index = norm_data.index)
 
-slopes_df = pd.DataFrame(slopes,index = norm_data.index)
-rvalue_df = pd.DataFrame(rsquared,index = norm_data.index)
+    slopes_dfs[plate] = slopes_df
+    rvalue_dfs[plate] = rvalue_df
+    plate_rates[plate] = pd.DataFrame.max(slopes_df,axis=1)
 
-rates = pd.DataFrame.max(slopes_df,axis=1)
+rates = pd.concat(plate_rates)
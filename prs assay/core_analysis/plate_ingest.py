@@ -0,0 +1,124 @@
+import argparse
+import glob
+import os
+import re
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', '..', 'plate_reader'))
+from plate import WELL_PATTERN
+
+ASSAY_PATTERN = re.compile(r'^assay_(.+)\.csv$')
+TIDY_COLUMNS = ['plate', 'well', 'label', 'time', 'value']
+
+def find_plates(paths):
+    """
+        Finds the plates in directories or glob patterns (a string or a
+        list): every assay_<plate>.csv with a map_<plate>.csv next to it.
+
+        Returns a sorted list of (plate, assay_fname, map_fname).
+    """
+    if isinstance(paths, basestring):
+        paths = [paths]
+    fnames = set()
+    for path in paths:
+        if os.path.isdir(path):
+            path = os.path.join(path, 'assay_*.csv')
+        fnames.update(glob.glob(path))
+
+    plates = []
+    for fname in sorted(fnames):
+        match = ASSAY_PATTERN.match(os.path.basename(fname))
+        if match is None:
+            continue
+        map_fname = os.path.join(os.path.dirname(fname), 'map_%s.csv' % match.group(1))
+        if not os.path.exists(map_fname):
+            print 'no map file for %s, skipping it' % fname
+            continue
+        plates.append((match.group(1), fname, map_fname))
+    return plates
+
+def read_map(fname):
+    """
+        Returns a Series mapping the well IDs (e.g. 'A1') to their labels.
+        The map has the plate rows (A-H, or A-P on 384 well plates) as its
+        index and the columns as its header, or the transpose, as in older map files.
+    """
+    map_df = pd.read_csv(fname, index_col=0, dtype=str)
+    if not str(map_df.index[0]).strip().isalpha():
+        map_df = map_df.T
+    labels = map_df.stack()
+    rows = pd.Series(labels.index.get_level_values(0)).astype(str).str.strip()
+    cols = pd.Series(labels.index.get_level_values(1)).astype(str).str.strip()
+    labels.index = (rows + cols).values
+    return labels
+
+def read_assay(fname):
+    """
+        Returns the time points and the readings of a plate, as a DataFrame
+        indexed by the well IDs, with one column per time point.
+
+        The time points are either a row that precedes the wells (as in the
+        plate reader export) or the header of the file; rows that are not
+        wells are dropped.
+    """
+    raw = pd.read_csv(fname, index_col=0)
+    index = np.array([str(i).strip() for i in raw.index])
+    is_well = np.array([WELL_PATTERN.match(i) is not None for i in index], dtype=bool)
+    if is_well[0]:
+        time = np.array(raw.columns, dtype=float)
+    else:
+        time = raw.iloc[0].values.astype(float)
+    data = raw[is_well].astype(float)
+    data.index = index[is_well]
+    return time, data
+
+def read_plate(assay_fname, map_fname):
+    """
+        Returns the time points and the readings of a plate, indexed by the
+        labels of the map
+    """
+    time, data = read_assay(assay_fname)
+    data.index = read_map(map_fname).reindex(data.index).values
+    return time, data
+
+def tidy_plate(assay_fname, map_fname, plate=None):
+    """
+        Returns a plate as a long-format table, with one row per well and
+        time point (see TIDY_COLUMNS)
+    """
+    time, data = read_assay(assay_fname)
+    labels = read_map(map_fname).reindex(data.index).values
+    n_wells, n_times = data.shape
+    return pd.DataFrame({'plate': plate,
+                         'well': np.repeat(data.index.values, n_times),
+                         'label': np.repeat(labels, n_times),
+                         'time': np.tile(time, n_wells),
+                         'value': data.values.ravel()},
+                        columns=TIDY_COLUMNS)
+
+def ingest(paths):
+    """
+        Reads all the plates found in paths (see find_plates) into one
+        long-format table
+    """
+    tables = [tidy_plate(assay_fname, map_fname, plate)
+              for plate, assay_fname, map_fname in find_plates(paths)]
+    if not tables:
+        return pd.DataFrame(columns=TIDY_COLUMNS)
+    return pd.concat(tables, ignore_index=True)
+
+def main():
+    parser = argparse.ArgumentParser(description='Collects assay_<plate>.csv/map_<plate>.csv pairs into one long-format table')
+    parser.add_argument('paths', nargs='+', help='directories or glob patterns of assay files')
+    parser.add_argument('-o', '--output', default='plates.csv', help='the output CSV file')
+    args = parser.parse_args()
+
+    table = ingest(args.paths)
+    table.to_csv(args.output, index=False)
+    print 'wrote %d rows from %d plates to %s' % (len(table), table['plate'].nunique(), args.output)
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,25 @@
 from Tkinter import *
 import tkFileDialog
 import pandas as pd
-import csv,re
+import csv,re,sys
 import scipy.stats as st
 import numpy as np
+from sliding_window import window_regression, max_rates
+sys.path.insert(0, '../../plate_reader')
+from plate import load_plate
 
-root = Tk()
-root.withdraw()
-data_file = tkFileDialog.askopenfile(initialdir='/home/yinonbaron/Documents/Experiments')
+if len(sys.argv) > 1:
+    data_fname = sys.argv[1]
+else:
+    root = Tk()
+    root.withdraw()
+    data_fname = tkFileDialog.askopenfile(initialdir='/home/yinonbaron/Documents/Experiments').name
 
-data = np.genfromtxt(data_file.name,dtype='object', delimiter=',')
-time = data[1,1:].astype('float')
-data = data[3:,1:].astype('float')
+p = load_plate(data_fname)
+time = p.time
+data = p.wells().astype('float')
 norm_data = data - data[:,0:1]
 window_size = 10
-slopes = np.empty([shape(norm_data)[0],shape(norm_data)[1]-window_size+1])
-rsquared = np.empty([shape(norm_data)[0],shape(norm_data)[1]-window_size+1])
-for x,i in enumerate(norm_data):
-    for j in range(0,shape(norm_data)[1]-10+1):
-        res = st.linregress(time[j:j+window_size],norm_data[x,j:j+window_size])
-        slopes[x,j] = res.slope
-        rsquared[x,j] = res.rvalue
+slopes, rsquared = window_regression(time,norm_data,window_size)
 
-rates = np.max(slopes,1)
\ No newline at end of file
+rates, rate_windows = max_rates(slopes)
\ No newline at end of file
@@ -0,0 +1,58 @@
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+def windows(a, window_size):
+    """
+        Returns a read-only strided view of the windows along the last axis
+        of a: shape (..., n - window_size + 1, window_size), without copying
+    """
+    a = np.ascontiguousarray(a, dtype=float)
+    n_windows = a.shape[-1] - window_size + 1
+    shape = a.shape[:-1] + (n_windows, window_size)
+    strides = a.strides + (a.strides[-1],)
+    return as_strided(a, shape=shape, strides=strides, writeable=False)
+
+def window_regression(time, data, window_size=10):
+    """
+        Fits a line to every window of window_size consecutive time points, in
+        every well at once.
+
+        time - the time points (length T)
+        data - the readings, a (wells x T) array
+
+        Returns the slopes and r-values, two (wells x T-window_size+1) arrays,
+        where column j is the fit of time points j..j+window_size-1. These are
+        the values of scipy.stats.linregress for each window (with r = 0 when
+        either the time or the readings are constant in the window).
+    """
+    t = windows(time, window_size)
+    y = windows(np.atleast_2d(data), window_size)
+
+    # sums of centered products, as in linregress
+    tm = t - t.mean(axis=-1)[:, np.newaxis]
+    ym = y - y.mean(axis=-1)[..., np.newaxis]
+    ssxm = (tm ** 2).sum(axis=-1)
+    ssym = (ym ** 2).sum(axis=-1)
+    ssxym = (tm * ym).sum(axis=-1)
+
+    slopes = ssxym / ssxm
+    r_den = np.sqrt(ssxm * ssym)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rvalues = np.where(r_den == 0, 0.0, ssxym / r_den)
+    return slopes, np.clip(rvalues, -1.0, 1.0)
+
+def max_rates(slopes, rvalues=None, min_rvalue=None):
+    """
+        Returns the maximal slope of every well and the index of the window
+        where it is reached. If min_rvalue is given, only windows with an
+        r-value of at least min_rvalue are considered (NaN where there are
+        none).
+    """
+    slopes = np.array(slopes, dtype=float)
+    if min_rvalue is not None:
+        slopes[np.asarray(rvalues) < min_rvalue] = np.nan
+    valid = ~np.all(np.isnan(slopes), axis=1)
+    starts = np.zeros(len(slopes), dtype=int)
+    starts[valid] = np.nanargmax(slopes[valid], axis=1)
+    rates = np.where(valid, slopes[np.arange(len(slopes)), starts], np.nan)
+    return rates, starts
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of plate_ingest, run with pytest from this directory.
+"""
+
+import os
+import numpy as np
+from plate_ingest import ingest
+
+def _write(fname, lines):
+    with open(fname, 'w') as fp:
+        fp.write('\n'.join(lines) + '\n')
+
+def test_ingest_384_well_plate(tmpdir):
+    # wells in rows I-P only exist on 384 well plates, and must not be
+    # dropped as non-well rows
+    dirname = str(tmpdir)
+    _write(os.path.join(dirname, 'assay_p1.csv'),
+           ['Cycle Nr.,1,2,3',
+            'Time [s],0,600,1200',
+            'A1,0.1,0.2,0.3',
+            'P24,0.4,0.5,0.6'])
+    _write(os.path.join(dirname, 'map_p1.csv'),
+           [',1,24',
+            'A,blank,',
+            'P,,sample'])
+
+    table = ingest(dirname)
+    assert sorted(table['well'].unique()) == ['A1', 'P24']
+    p24 = table[table['well'] == 'P24']
+    assert list(p24['label']) == ['sample'] * 3
+    assert np.allclose(p24['time'], [0, 600, 1200])
+    assert np.allclose(p24['value'], [0.4, 0.5, 0.6])
@@ -2,6 +2,9 @@
 
 import pandas as pd
 import numpy as np
+import sys
+sys.path.insert(0, '../plate_reader')
+from plate import load_plate
 #import  seaborn as sns
 
 import matplotlib.pyplot as plt
@@ -16,16 +19,11 @@ time = e['Time [s]']
 data = e[e.columns[5:]]
 
 
-e2 = pd.read_csv('/home/yinonbaron/Documents/Experiments/pyruvate transporter/20151220_pyr_trans_clones_different_cs.csv')
-time2 = e2.loc[0][e2.columns[1:]]
-data2 = e2.loc[2:][e2.columns[1:]]
+# parsed once, and memory-mapped from the plate cache on later runs
+p = load_plate('/home/yinonbaron/Documents/Experiments/pyruvate transporter/20151220_pyr_trans_clones_different_cs.csv')
 
-
-raw_data = np.loadtxt('/home/yinonbaron/Documents/Experiments/pyruvate transporter/20151220_pyr_trans_clones_different_cs.csv',delimiter=',',dtype='object')
-
-time = raw_data[1,1:].astype('float')
-data = raw_data[3:,1:].astype('float')
-reshaped_data = np.reshape(data,[8,12,-1])
+time = p.time
+reshaped_data = p.channel(0)
 norm_data = np.subtract(reshaped_data, reshaped_data[:,:,0:1])
 
 plt.plot(time[:,], norm_data[0,0:1,:].T)
\ No newline at end of file
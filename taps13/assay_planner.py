@@ -0,0 +1,118 @@
+import numpy as np
+from collections import Counter
+from sparse_model import sparse_model
+
+class coupled_assay_planner(object):
+    """
+        Plans coupled enzyme assays by a bounded breadth-first search from a
+        readout metabolite (e.g. NADH, NADPH or ATP).
+
+        Hop 0 holds the reactions that produce the readout. Hop k holds the
+        reactions that produce a reactant of a reaction in hop k-1, and are
+        not part of any earlier hop. Only reactions catalyzed by homomeric
+        enzymes (no 'and' in the gene-reaction rule) that are thermodynamically
+        favorable (dG0' below max_dG) are used.
+
+        The gene-reaction rules are parsed once, into the homomeric array,
+        and the favorable reactions of every threshold are kept as a boolean
+        array, so changing max_dG does not require another pass over the
+        reaction objects.
+    """
+
+    def __init__(self, model, max_dG=10, attribute='dG0_prime'):
+        self.sparse = sparse_model(model, attribute)
+        self.max_dG = max_dG
+        self.homomeric = np.array(['and' not in r.gene_reaction_rule
+                                   for r in self.sparse.reactions], dtype=bool)
+        self._masks = {}
+        self._producers = {}
+
+    def reaction_mask(self, max_dG=None):
+        """
+            Returns a boolean array of the reactions that are homomeric and
+            favorable (dG0' below max_dG, by default self.max_dG)
+        """
+        if max_dG is None:
+            max_dG = self.max_dG
+        if max_dG not in self._masks:
+            self._masks[max_dG] = self.homomeric & (self.sparse.dG < max_dG)
+        return self._masks[max_dG]
+
+    def filtered_producers(self, metabolite, max_dG=None):
+        """
+            Returns the indices of the homomeric and favorable reactions that
+            produce the metabolite (memoized per metabolite and threshold)
+        """
+        if max_dG is None:
+            max_dG = self.max_dG
+        key = (self.sparse._index(metabolite), max_dG)
+        if key not in self._producers:
+            producers = self.sparse.producers(key[0])
+            self._producers[key] = producers[self.reaction_mask(max_dG)[producers]]
+        return self._producers[key]
+
+    def plan(self, readout, depth, excluded=('h2o_c',), max_dG=None):
+        """
+            Runs the search up to the given depth (number of hops after the
+            readout-producing reactions).
+
+            readout  - the ID of the readout metabolite
+            excluded - IDs of reactants that are not expanded (the readout
+                       itself is never expanded)
+            max_dG   - the threshold for favorable reactions (by default
+                       self.max_dG)
+
+            Returns a list of depth+1 dictionaries (one per hop), mapping each
+            reaction to the list of (reaction, metabolite) pairs that link it
+            to the previous hop.
+        """
+        sm = self.sparse
+        excluded = sm.get_metabolite_mask(excluded)
+        excluded[sm._index(readout)] = True
+
+        seen = set(self.filtered_producers(readout, max_dG))
+        hops = [dict([(j, []) for j in self.filtered_producers(readout, max_dG)])]
+        for k in xrange(depth):
+            next_hop = {}
+            for j in sorted(hops[-1]):
+                for m in sm.reactants(j):
+                    if excluded[m]:
+                        continue
+                    for l in self.filtered_producers(m, max_dG):
+                        if l not in seen:
+                            next_hop.setdefault(l, []).append((j, m))
+            seen.update(next_hop)
+            hops.append(next_hop)
+
+        return [dict([(sm.reactions[j], [(sm.reactions[p], sm.metabolites[m])
+                                         for p, m in links])
+                      for j, links in hop.iteritems()])
+                for hop in hops]
+
+    @staticmethod
+    def chains(hops):
+        """
+            Yields every coupled-assay chain of a plan, as a list starting
+            with the assayed reaction and alternating between metabolites and
+            reactions, down to a reaction producing the readout.
+        """
+        for k, hop in enumerate(hops):
+            for reaction in hop:
+                stack = [(k, [reaction])]
+                while stack:
+                    level, chain = stack.pop()
+                    if level == 0:
+                        yield chain
+                        continue
+                    for parent, metabolite in hops[level][chain[-1]]:
+                        stack.append((level-1, chain + [metabolite, parent]))
+
+    def coverage(self, hops):
+        """
+            Returns the percentage of the reactions in every subsystem that
+            can be assayed according to the plan
+        """
+        reaction_counter = Counter([r.subsystem for r in self.sparse.reactions])
+        tmp = Counter([r.subsystem for hop in hops for r in hop])
+        return dict([(k, tmp[k]/float(reaction_counter[k])*100)
+                     for k in reaction_counter.iterkeys()])
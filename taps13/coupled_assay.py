@@ -12,54 +12,37 @@ from cobra.io.sbml import create_cobra_model_from_sbml_file
 import pandas as pd
 from collections import defaultdict
 from thermodynamics_for_cobra import reaction_thermodynamics
-
-def filter_reactions(metabolite, only_irreversible=True):
-    metabolite_forming_reactions = [r for r in metabolite.reactions 
-                              if metabolite in r.products]
-    
-    homomeric_reactions = filter(lambda r: 'and' not in r.gene_reaction_rule, 
-                                 metabolite_forming_reactions)
-    reactions = {r:r.dG0_prime for r in homomeric_reactions}
-    if only_irreversible:
-        reactions = {k:v for k,v in reactions.iteritems() if v<10}
-    return reactions
+from assay_planner import coupled_assay_planner
+from table_writer import write_table
 
 #model = create_cobra_model_from_sbml_file('../data/iJO1366.xml')
 model = create_cobra_model_from_sbml_file('/home/yinonbaron/git/shared_data/iJO1366.xml')
 
 add_to_model(model)
 tr = reaction_thermodynamics(model.reactions)
-nadh = model.metabolites.get_by_id('nadh_c')    
+planner = coupled_assay_planner(model)
+
 # reactions which produce NADH, and are thermodynamically favorable
 # Also, all reactions are catalyzed by homomeric enzymes.
-nadh_forming = filter_reactions(nadh, only_irreversible=True)
-
-water = model.metabolites.get_by_id('h2o_c')
-
-first_hop = defaultdict(list)
-for r in nadh_forming:
-    for m in r.reactants:
-        if m not in [water, nadh]:
-            homomeric_and_favorable = filter_reactions(m)
-            for k in homomeric_and_favorable.iterkeys():
-                if k not in nadh_forming:
-                    first_hop[k].append([r.id,m.id])
-
-second_hop = defaultdict(list)
-for r in first_hop.keys():
-    for m in r.reactants:
-        if m not in [water, nadh]:
-            homomeric_and_favorable = filter_reactions(m)
-            for k in homomeric_and_favorable.iterkeys():
-                if k not in first_hop and k not in nadh_forming:
-                    second_hop[k].append([r.id,m.id])
-
-enzyme_assays = nadh_forming.keys()+first_hop.keys()+second_hop.keys()
-reaction_counter = Counter([r.subsystem for r in model.reactions])
-tmp = Counter([r.subsystem for r in enzyme_assays])
-coverage = {k:tmp[k]/float(reaction_counter[k])*100 for k in reaction_counter.iterkeys()}
+# each hop adds the reactions producing the substrates of the previous hop
+hops = planner.plan('nadh_c', depth=2)
+nadh_forming, first_hop, second_hop = hops
+
+enzyme_assays = [r for hop in hops for r in hop]
+
+# stream every coupled-assay chain to a table
+chain_rows = ([len(chain) // 2, chain[0].id, ' <- '.join([x.id for x in chain])]
+              for chain in planner.chains(hops))
+write_table(chain_rows, '../res/nadh_coupled_assay_chains.tsv',
+            header=['hops', 'reaction', 'chain'])
+coverage = planner.coverage(hops)
 print sum(coverage.values()) / len(coverage.keys())
 
+# the mean coverage for other thresholds of favorable reactions
+for max_dG in [-10, 0, 10, 20]:
+    tmp = planner.coverage(planner.plan('nadh_c', depth=2, max_dG=max_dG))
+    print max_dG, sum(tmp.values()) / len(tmp.keys())
+
 #homomeric_reactions = defaultdict(list)
 #reactions = []
 #for r in nadh_forming_reactions:
@@ -0,0 +1,76 @@
+import numpy as np
+import scipy.sparse
+from table_writer import write_table
+
+def iter_irreversible_pairs(sm, max_dG=-10, excluded=(), max_consumers=None,
+                            chunk_size=1000):
+    """
+        Finds all pairs of consecutive irreversible reactions, i.e. a reaction
+        with dG below max_dG that produces a metabolite consumed by another
+        reaction with dG below max_dG.
+
+        sm            - a sparse_model (with dG set to e.g. dGm_prime)
+        excluded      - IDs of metabolites (cofactors) that do not link pairs
+        max_consumers - if given, only metabolites consumed by at most this
+                        many reactions (of any kind) link pairs
+
+        The triples are found by sparse matrix products: the (reactions x
+        metabolites) irreversible production matrix is multiplied by a
+        (metabolites x links) matrix with one column for each (metabolite,
+        irreversible consumer) link. The product is done for chunk_size
+        first reactions at a time, so memory does not grow with the number
+        of pairs.
+
+        Yields arrays of (first reaction, metabolite, second reaction) index
+        triples, sorted by the first reaction.
+    """
+    irreversible = sm.dG < max_dG
+    linking = ~sm.get_metabolite_mask(excluded)
+    if max_consumers is not None:
+        linking &= np.diff(sm.consumption.indptr) <= max_consumers
+
+    production = sm.production.tocoo()
+    keep = linking[production.row] & irreversible[production.col]
+    production = scipy.sparse.csr_matrix(
+        (np.ones(keep.sum()), (production.col[keep], production.row[keep])),
+        shape=(len(sm.reactions), len(sm.metabolites)))
+
+    consumption = sm.consumption.tocoo()
+    keep = linking[consumption.row] & irreversible[consumption.col]
+    link_metabolites = consumption.row[keep]
+    link_reactions = consumption.col[keep]
+    links = scipy.sparse.csr_matrix(
+        (np.ones(len(link_metabolites)), (link_metabolites, np.arange(len(link_metabolites)))),
+        shape=(len(sm.metabolites), len(link_metabolites)))
+
+    for start in xrange(0, len(sm.reactions), chunk_size):
+        pairs = (production[start:start+chunk_size] * links).tocoo()
+        order = np.lexsort((pairs.col, pairs.row))
+        first, link = pairs.row[order] + start, pairs.col[order]
+        yield np.column_stack([first, link_metabolites[link], link_reactions[link]])
+
+def find_irreversible_pairs(sm, max_dG=-10, excluded=(), max_consumers=None):
+    """
+        Returns all the triples of iter_irreversible_pairs as one array
+    """
+    return np.vstack(list(iter_irreversible_pairs(sm, max_dG, excluded, max_consumers)))
+
+def iter_pair_rows(sm, triples):
+    """
+        Yields the IRPairs table rows of the triples (an iterable of triple
+        arrays, as from iter_irreversible_pairs): the subsystem, name and
+        genes of the first reaction, the name of the linking metabolite and
+        the name and genes of the second reaction
+    """
+    for chunk in triples:
+        for i, m, j in chunk:
+            first, second = sm.reactions[i], sm.reactions[j]
+            yield [first.subsystem, first.name, first.gene_name_reaction_rule,
+                   sm.metabolites[m].name, second.name, second.gene_name_reaction_rule]
+
+def write_irreversible_pairs(sm, triples, fname):
+    """
+        Streams the IRPairs table to a TSV (or Parquet) file, see
+        table_writer.write_table
+    """
+    return write_table(iter_pair_rows(sm, triples), fname)
@@ -0,0 +1,53 @@
+from itertools import combinations, imap
+
+def search_knockouts(single_ko_list, max_knockouts, get_precursors, precursors,
+                     map_function=imap):
+    """
+        Walks the lattice of knockout combinations level by level (all the
+        single knockouts, then all the pairs, etc.), and finds the set of
+        precursors that each combination can still produce.
+
+        Since adding a knockout can never rescue the production of a
+        precursor, a combination can produce at most the intersection of the
+        sets of its sub-combinations. Only these candidates are tested, and
+        supersets of combinations that cannot produce any precursor are never
+        generated at all.
+
+        Arguments:
+            single_ko_list - the knockouts to combine (as in models.knockout_reactions)
+            max_knockouts  - the size of the largest combination
+            get_precursors - a function getting a (ko_list, candidates) tuple
+                             and returning the set of candidates that the
+                             KO strain can produce
+            precursors     - the candidates for the single knockouts
+            map_function   - used for running get_precursors on all the
+                             combinations of one level, e.g. Pool.imap
+
+        Yields (ko_list, precursors) for every combination that can produce
+        at least one precursor, in the order of itertools.combinations.
+    """
+    precursors = frozenset(precursors)
+    previous_level = {(): precursors}
+    for level in xrange(1, max_knockouts+1):
+        tasks = []
+        for ko_list in combinations(single_ko_list, level):
+            candidates = precursors
+            for sub_list in combinations(ko_list, level-1):
+                # sub-combinations that are missing from the previous level
+                # have already lost all their precursors
+                candidates = candidates & previous_level.get(sub_list, frozenset())
+                if not candidates:
+                    break
+            if candidates:
+                tasks.append((ko_list, candidates))
+
+        current_level = {}
+        for (ko_list, candidates), found in zip(tasks, map_function(get_precursors, tasks)):
+            found = frozenset(found) & candidates
+            if found:
+                current_level[ko_list] = found
+                yield ko_list, found
+
+        if not current_level:
+            return
+        previous_level = current_level
@@ -0,0 +1,183 @@
+from cobra.solvers import solver_dict, get_solver_name
+from models import clone_model
+
+class variant_base(object):
+    """
+        A cobra model shared by many strain variants.
+
+        Every reaction that a variant might knock in must already be part of
+        the base model (with its bounds closed, e.g. using
+        knockin_reactions(model, ..., 0, 0)), so that the variants differ from
+        the base only by reaction bounds and objective coefficients. The LP is
+        created once from the base model and every variant is solved by
+        changing only the bounds and objective coefficients that differ from
+        the previously solved variant.
+    """
+
+    def __init__(self, model, solver=None):
+        self.model = model
+        self.reaction_index = dict([(r.id, i) for i, r in enumerate(model.reactions)])
+        self.bounds = dict([(r.id, (r.lower_bound, r.upper_bound))
+                            for r in model.reactions])
+        self.objective = dict([(r.id, r.objective_coefficient)
+                               for r in model.reactions
+                               if r.objective_coefficient != 0])
+        self.solver = solver_dict[solver or get_solver_name()]
+        self._lp = None
+        self._lp_bounds = {}
+        self._lp_objective = dict(self.objective)
+
+    def problem(self):
+        if self._lp is None:
+            self._lp = self.solver.create_problem(self.model)
+        return self._lp
+
+    def set_bounds(self, bounds):
+        """
+            bounds - a dictionary of all the reactions whose bounds differ
+                     from the base model, mapped to (lower, upper)
+        """
+        lp = self.problem()
+        for rid in set(self._lp_bounds) - set(bounds):
+            lb, ub = self.bounds[rid]
+            self.solver.change_variable_bounds(lp, self.reaction_index[rid], lb, ub)
+        for rid, (lb, ub) in bounds.iteritems():
+            if self._lp_bounds.get(rid, self.bounds[rid]) != (lb, ub):
+                self.solver.change_variable_bounds(lp, self.reaction_index[rid], lb, ub)
+        self._lp_bounds = dict(bounds)
+
+    def set_objective(self, objective):
+        """
+            objective - a dictionary of all the reactions with a non-zero
+                        objective coefficient
+        """
+        lp = self.problem()
+        for rid in set(self._lp_objective) - set(objective):
+            self.solver.change_variable_objective(lp, self.reaction_index[rid], 0)
+        for rid, coeff in objective.iteritems():
+            if self._lp_objective.get(rid, 0) != coeff:
+                self.solver.change_variable_objective(lp, self.reaction_index[rid], coeff)
+        self._lp_objective = dict(objective)
+
+    def optimize(self):
+        """
+            Re-solves the LP with the current bounds and objective, and
+            returns the objective value (or None if the LP is infeasible)
+        """
+        lp = self.problem()
+        self.solver.solve_problem(lp)
+        if self.solver.get_status(lp) != 'optimal':
+            return None
+        return self.solver.get_objective_value(lp)
+
+class model_variant(object):
+    """
+        A strain design, stored only as its differences from a shared
+        variant_base: overridden bounds, knocked-out (removed) reactions and
+        knocked-in (added) reactions. Creating a variant does not copy the
+        cobra model, so many thousands of them can be held in memory.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.bounds = {}      # reaction ID -> (lower, upper)
+        self.removed = set()  # IDs of knocked-out reactions
+        self.added = {}       # IDs of knocked-in reactions -> (lower, upper)
+        self.objective = None # None stands for the objective of the base model
+
+    def copy(self):
+        variant = model_variant(self.base)
+        variant.bounds = dict(self.bounds)
+        variant.removed = set(self.removed)
+        variant.added = dict(self.added)
+        if self.objective is not None:
+            variant.objective = dict(self.objective)
+        return variant
+
+    def _check_reaction(self, rid):
+        if rid not in self.base.reaction_index:
+            raise KeyError('The base model does not have a reaction with ID: ' + rid)
+
+    def set_bounds(self, rid, lower_bound, upper_bound):
+        self._check_reaction(rid)
+        self.bounds[rid] = (lower_bound, upper_bound)
+
+    def knockout_reactions(self, ko_reactions):
+        for rid in ko_reactions.split(','):
+            self._check_reaction(rid)
+            self.removed.add(rid)
+
+    def knockin_reactions(self, ki_reactions, lower_bound=0, upper_bound=1000):
+        for rid in ki_reactions.split(','):
+            if rid.startswith('EX_'):
+                rid = rid + '_e'
+            self._check_reaction(rid)
+            self.added[rid] = (lower_bound, upper_bound)
+
+    def set_exchange_bounds(self, metabolite, lower_bound, upper_bound=0):
+        self.set_bounds('EX_' + metabolite + '_e', lower_bound, upper_bound)
+
+    def set_objective(self, objective):
+        for rid in objective.iterkeys():
+            self._check_reaction(rid)
+        self.objective = dict(objective)
+
+    def get_objective(self):
+        if self.objective is None:
+            return self.base.objective
+        return self.objective
+
+    def get_bounds(self):
+        """
+            Returns the bounds of all the reactions that differ from the base
+        """
+        bounds = dict(self.added)
+        bounds.update(self.bounds)
+        for rid in self.removed:
+            bounds[rid] = (0, 0)
+        return bounds
+
+    def solve_FBA(self):
+        self.base.set_bounds(self.get_bounds())
+        self.base.set_objective(self.get_objective())
+        return self.base.optimize()
+
+    def get_precursor_yields(self, precursors, upper_bound=1000):
+        """
+            Calculates the maximal production rate of each precursor.
+
+            The base model must have a 'Biomass_<precursor>' sink for each
+            precursor (see models.add_precursor_sink). All the sinks are opened
+            and the LP is re-optimized once per precursor, changing only the
+            objective, so that the solver starts every solve from the basis
+            of the previous one.
+
+            Returns a dictionary mapping each precursor to its yield, or to
+            None if the LP is infeasible.
+        """
+        sinks = dict([(p, 'Biomass_' + p) for p in precursors])
+        bounds = self.get_bounds()
+        for rid in sinks.itervalues():
+            self._check_reaction(rid)
+            bounds[rid] = (0, upper_bound)
+        self.base.set_bounds(bounds)
+
+        yields = {}
+        for p in sorted(sinks):
+            self.base.set_objective({sinks[p] : 1})
+            yields[p] = self.base.optimize()
+        return yields
+
+    def to_model(self):
+        """
+            Creates a full cobra model of this variant (e.g. for OptKnock)
+        """
+        model = clone_model(self.base.model)
+        for rid, (lb, ub) in self.get_bounds().iteritems():
+            r = model.reactions.get_by_id(rid)
+            r.lower_bound, r.upper_bound = lb, ub
+        objective = self.get_objective()
+        for r in model.reactions:
+            r.objective_coefficient = objective.get(r.id, 0)
+        model.remove_reactions(sorted(self.removed))
+        return model
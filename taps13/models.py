@@ -1,15 +1,42 @@
 import scipy.sparse
 from itertools import chain
-import os, sys, pickle, re
+import os, sys, re, hashlib
+import cPickle as pickle
 from copy import deepcopy
 from cobra.manipulation.modify import convert_to_irreversible
 from cobra.io.sbml import create_cobra_model_from_sbml_file
 from cobra.core import Reaction, Metabolite, Formula
 
-def init_wt_model(model_name, carbon_sources, reversible=False, ATP_maintenance=False, BM_lower_bound=0.1):
+MODEL_FNAMES = {'core' : '../shared_data/ecoli_core_model.xml',
+                'full' : '../shared_data/iJO1366.xml',
+                'toy'  : 'data/toymodel.xml'}
+
+# pickled snapshots of the parsed SBML models are kept here, so that only the
+# first process to ask for a model pays for parsing the SBML file
+MODEL_CACHE_DIR = 'cache'
+
+# in-process cache of pickled snapshots, keyed by (file hash, options)
+_model_snapshots = {}
+
+# in-process cache of the SBML file hashes, keyed by (path, mtime, size), so
+# that a file is only read again when it changes
+_file_hashes = {}
+
+def _file_hash(fname):
+    st = os.stat(fname)
+    stat_key = (os.path.abspath(fname), st.st_mtime, st.st_size)
+    if stat_key not in _file_hashes:
+        sha = hashlib.sha1()
+        with open(fname, 'rb') as fp:
+            for chunk in iter(lambda: fp.read(1 << 20), ''):
+                sha.update(chunk)
+        _file_hashes[stat_key] = sha.hexdigest()
+    return _file_hashes[stat_key]
+
+def _parse_wt_model(model_name, reversible=False, ATP_maintenance=False, BM_lower_bound=0.1):
     
     if model_name == 'core':
-        model = create_cobra_model_from_sbml_file('../shared_data/ecoli_core_model.xml', old_sbml=True)
+        model = create_cobra_model_from_sbml_file(MODEL_FNAMES['core'], old_sbml=True)
         if reversible:
             convert_to_irreversible(model)
         # the core model has these annoying '_b' metabolites that are used as
@@ -28,16 +55,13 @@ def init_wt_model(model_name, carbon_sources, reversible=False, ATP_maintenance=
             rxns['ATPM'].lower_bound = 0 # remove the ATP maintenance requirement
         rxns['EX_glc_e'].lower_bound = 0 # remove the default carbon source
     elif model_name == 'full':
-        model = create_cobra_model_from_sbml_file('../shared_data/iJO1366.xml', old_sbml=True)
+        model = create_cobra_model_from_sbml_file(MODEL_FNAMES['full'], old_sbml=True)
         rxns = dict([(r.id, r) for r in model.reactions])
         if not ATP_maintenance:
             rxns['ATPM'].lower_bound = 0 # remove the ATP maintenance requirement
         rxns['EX_glc_e'].lower_bound = 0 # remove the default carbon source
     elif model_name == 'toy':
-        model = create_cobra_model_from_sbml_file('data/toymodel.xml')
-        
-    for key, val in carbon_sources.iteritems():
-        rxns['EX_' + key + '_e'].lower_bound = val
+        model = create_cobra_model_from_sbml_file(MODEL_FNAMES['toy'])
         
     # set BM lower bound
     for r in model.reactions:
@@ -46,6 +70,51 @@ def init_wt_model(model_name, carbon_sources, reversible=False, ATP_maintenance=
     
     return model
 
+def load_wt_model(model_name, reversible=False, ATP_maintenance=False, BM_lower_bound=0.1):
+    """
+        Returns a fresh copy of the wild-type model.
+        
+        The SBML file is parsed at most once per process. The parsed model is
+        kept as a pickled snapshot, both in memory and in MODEL_CACHE_DIR
+        (keyed by the hash of the SBML file and the options), so that every
+        later call - in this process or in any other one - only unpickles it.
+        The SBML file itself is only hashed again when its size or
+        modification time changes.
+    """
+    key = (_file_hash(MODEL_FNAMES[model_name]),
+           bool(reversible), bool(ATP_maintenance), float(BM_lower_bound))
+    
+    if key not in _model_snapshots:
+        cache_fname = os.path.join(MODEL_CACHE_DIR, '%s_%s_%d_%d_%g.pkl' %
+                                   ((model_name,) + key))
+        if os.path.exists(cache_fname):
+            with open(cache_fname, 'rb') as fp:
+                snapshot = fp.read()
+        else:
+            model = _parse_wt_model(model_name, reversible, ATP_maintenance, BM_lower_bound)
+            snapshot = pickle.dumps(model, pickle.HIGHEST_PROTOCOL)
+            if not os.path.exists(MODEL_CACHE_DIR):
+                os.makedirs(MODEL_CACHE_DIR)
+            # write to a temporary file first, so that parallel workers never
+            # read a half-written snapshot
+            tmp_fname = '%s.%d' % (cache_fname, os.getpid())
+            with open(tmp_fname, 'wb') as fp:
+                fp.write(snapshot)
+            os.rename(tmp_fname, cache_fname)
+        _model_snapshots[key] = snapshot
+        
+    return pickle.loads(_model_snapshots[key])
+
+def init_wt_model(model_name, carbon_sources, reversible=False, ATP_maintenance=False, BM_lower_bound=0.1):
+    
+    model = load_wt_model(model_name, reversible, ATP_maintenance, BM_lower_bound)
+    
+    rxns = dict([(r.id, r) for r in model.reactions])
+    for key, val in carbon_sources.iteritems():
+        rxns['EX_' + key + '_e'].lower_bound = val
+    
+    return model
+
 def clone_model(model):
     return deepcopy(model)
 
@@ -158,20 +227,26 @@ def set_exchange_bounds(model, metabolite, lower_bound, upper_bound=0):
     except KeyError:
         add_metabolite_exchange(model, metabolite, lower_bound, upper_bound)
 
-def set_single_precursor_objective(model, metabolite, lower_bound=0, upper_bound=1000):
+def add_precursor_sink(model, metabolite, lower_bound=0, upper_bound=1000):
+    """
+        Adds a 'Biomass_<metabolite>' reaction that drains a single precursor
+    """
     try:
         met = model.metabolites[model.metabolites.index(metabolite + '_c')]
     except AttributeError:
         raise KeyError('Model does not have a metabolite with ID: ' + metabolite)
     
+    if metabolite == 'accoa':
+        return add_reaction(model, 'Biomass_accoa', met.name + ' biomass',
+                            {'accoa_c' : -1, 'coa_c' : 1}, lower_bound, upper_bound)
+    else:
+        return add_reaction(model, 'Biomass_' + metabolite, met.name + ' biomass',
+                            {metabolite + '_c' : -1}, lower_bound, upper_bound)
+
+def set_single_precursor_objective(model, metabolite, lower_bound=0, upper_bound=1000):
     for r in model.reactions:
         r.objective_coefficient = 0
 
-    if metabolite == 'accoa':
-        r = add_reaction(model, 'Biomass_accoa', met.name + ' biomass',
-                         {'accoa_c' : -1, 'coa_c' : 1}, lower_bound, upper_bound)
-    else:
-        r = add_reaction(model, 'Biomass_' + metabolite, met.name + ' biomass',
-                         {metabolite + '_c' : -1}, lower_bound, upper_bound)
+    r = add_precursor_sink(model, metabolite, lower_bound, upper_bound)
     r.objective_coefficient = 1
     
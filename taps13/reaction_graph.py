@@ -0,0 +1,139 @@
+import numpy as np
+from collections import defaultdict
+from sparse_model import sparse_model
+
+class disjoint_set(object):
+    """
+        A union-find structure over hashable items
+    """
+
+    def __init__(self, items=()):
+        self.parent = {}
+        self.size = {}
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        if item not in self.parent:
+            self.parent[item] = item
+            self.size[item] = 1
+
+    def find(self, item):
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]] # path halving
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size.pop(b)
+        return a
+
+    def sizes(self):
+        """
+            Returns the sizes of all the sets, largest first
+        """
+        return sorted(self.size.itervalues(), reverse=True)
+
+    def groups(self):
+        groups = defaultdict(list)
+        for item in self.parent:
+            groups[self.find(item)].append(item)
+        return groups.values()
+
+class reaction_neighborhood(object):
+    """
+        An index of the reactions consuming each metabolite of a cobra model
+        (based on sparse_model), built once, for searching the metabolite
+        graph at different thermodynamic thresholds.
+    """
+
+    def __init__(self, model, attribute='dGm_prime'):
+        self.sparse = sparse_model(model, attribute)
+        self.metabolites = self.sparse.metabolites
+
+    def neighbors(self, metabolite, del_g_tresh):
+        """
+            Returns the products of all reactions that consume the metabolite
+            and are reversible, i.e. have a dG above the threshold
+        """
+        i = self.sparse.metabolite_index[metabolite.id]
+        return self.sparse.get_metabolites(
+            self.sparse.neighbors(i, self.sparse.dG > del_g_tresh))
+
+    def find_clicks(self, del_g_tresh, excluded=()):
+        """
+            Partitions the metabolites into clicks: starting from the first
+            metabolite (in model order) that is not part of a click yet, a click
+            is everything it reaches through reversible reactions and that is
+            not part of an earlier click.
+
+            excluded - IDs of metabolites (e.g. cofactors) that are left out
+
+            Every metabolite is expanded only once, so this runs in time linear
+            in the size of the model.
+        """
+        reversible = self.sparse.dG > del_g_tresh
+        visited = self.sparse.get_metabolite_mask(excluded)
+        clicks = []
+        for i in xrange(len(self.metabolites)):
+            if visited[i]:
+                continue
+            visited[i] = True
+            click = [i]
+            next_step = [i]
+            while next_step:
+                current_step, next_step = next_step, []
+                for m in current_step:
+                    for p in self.sparse.neighbors(m, reversible):
+                        if not visited[p]:
+                            visited[p] = True
+                            next_step.append(p)
+                click += next_step
+            clicks.append(self.sparse.get_metabolites(click))
+        return clicks
+
+    def threshold_sweep(self, thresholds, excluded=()):
+        """
+            Clusters the metabolites that are connected by reversible
+            reactions, for a series of thresholds going from the strictest
+            (highest) to the most permissive one.
+
+            Unlike clicks, these clusters are the undirected connected
+            components: a reversible reaction joins all of its reactants and
+            products (except for the excluded metabolite IDs). The reactions
+            are sorted by dG only once, and each of them is merged into a
+            single union-find structure when the threshold passes its dG, so
+            the whole sweep costs about as much as one clustering.
+
+            Yields (threshold, clusters) for every threshold, where clusters
+            is a disjoint_set (see sizes() and groups()) that is updated in
+            place by the following iterations.
+        """
+        sm = self.sparse
+        keep = ~sm.get_metabolite_mask(excluded)
+        clusters = disjoint_set(sm.get_metabolites(np.flatnonzero(keep)))
+
+        edges = []
+        for j in np.argsort(-sm.dG, kind='mergesort'):
+            if np.isnan(sm.dG[j]):
+                continue
+            reactants = sm.reactants(j)[keep[sm.reactants(j)]]
+            products = sm.products(j)[keep[sm.products(j)]]
+            if len(reactants) and len(products):
+                edges.append((sm.dG[j], sm.get_metabolites(np.concatenate([reactants, products]))))
+
+        i = 0
+        for threshold in sorted(thresholds, reverse=True):
+            while i < len(edges) and edges[i][0] > threshold:
+                first = edges[i][1][0]
+                for m in edges[i][1][1:]:
+                    clusters.union(first, m)
+                i += 1
+            yield threshold, clusters
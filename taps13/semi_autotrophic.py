@@ -1,18 +1,22 @@
 #!/usr/bin/python
 import scipy.sparse
-from itertools import chain, combinations
+from itertools import chain, imap
 import os, sys, pickle, csv
+import multiprocessing
 from copy import deepcopy
 import numpy as np
 import matplotlib.pyplot as plt
 
 from analysis_toolbox import model_summary, plot_multi_PPP
 from models import *
+from model_variants import variant_base, model_variant
+from knockout_search import search_knockouts
 from optknock import OptKnock
 from draw_flux import DrawFlux
 from html_writer import HtmlWriter
 
 NUMBER_OF_KNOCKOUTS = 1
+NUMBER_OF_PROCESSES = 1
 BIOMASS_PRECURSORS = set(['3pg', 'accoa', 'e4p', 'f6p', 'g3p', 'g6p', 'gln_L', 'glu_L',
                       'oaa', 'pep', 'pyr', 'r5p'])
 
@@ -26,6 +30,10 @@ carbon_sources = ['g6p', 'f6p', '6pgc', 'r5p', 'succ', 'xu5p_D', '2pg', 'pyr', '
 
 carbon_sources = ['xu5p_D']
 
+# all the reactions that any of the strain variants can knock in
+BASE_KNOCKINS = 'EDD,EDA,RBC,PRK,SBP,SBA,RED'
+BASE_EXCHANGE_KNOCKINS = 'EX_g6p,EX_f6p,EX_xu5p_D,EX_r5p,EX_dhap,EX_2pg,EX_e4p,EX_6pgc'
+
 def generate_model(ko_list, carbon_source,
                    carbon_uptake_rate=50, BM_lower_bound=0.1,
                    knockins='EDD,EDA,RBC,PRK,SBP,SBA'):
@@ -56,96 +64,193 @@ def generate_model(ko_list, carbon_source,
         knockout_reactions(model, ko)
     return model
 
-def get_precursors(ko_list, energy_source='electrons', knockins='EDD,EDA,RBC,PRK'):
+def create_base_model():
     """
-        checks whether the model can produce at least one biomass precursor
+        Creates the model shared by all the strain variants, i.e. the core
+        model without ZWF, where all the knock-in reactions are closed
     """
-    temp_model = generate_model(ko_list, energy_source, BM_lower_bound=0, knockins=knockins)
-    electron_precursors = set([])
+    model = init_wt_model('core', {}, BM_lower_bound=0)
+    knockin_reactions(model, BASE_KNOCKINS, 0, 0)
+    knockin_reactions(model, BASE_EXCHANGE_KNOCKINS, 0, 0)
+    knockout_reactions(model, 'G6PDH2r,PGL') # always knockout the ZWF gene
     for precursor in BIOMASS_PRECURSORS:
-        set_single_precursor_objective(temp_model, precursor)
+        add_precursor_sink(model, precursor, 0, 0)
+    return variant_base(model)
 
-        # Run the optimization for the objective reaction and medium composition
-        # set in the file.
-        ok = OptKnock(temp_model)
-        ok.prepare_FBA_primal()
-        ok.solve()
+def generate_variant(base, ko_list, carbon_source,
+                     carbon_uptake_rate=50, BM_lower_bound=0.1,
+                     knockins='EDD,EDA,RBC,PRK,SBP,SBA'):
+    """
+        Same as generate_model, but returns a model_variant of the base
+        (see create_base_model) instead of a new cobra model
+    """
+    variant = model_variant(base)
+    for rid in variant.get_objective().iterkeys():
+        variant.set_bounds(rid, BM_lower_bound, base.bounds[rid][1])
+    variant.knockin_reactions(knockins, 0, 1000)
+    
+    if carbon_source == 'electrons':
+        variant.knockin_reactions('RED', 0, carbon_uptake_rate*2)
+    else:
+        # find out how many carbon atoms are in the carbon source
+        # and normalize the uptake rate to be in units of mmol carbon-source / (gDW*h) 
 
-        if ok.get_objective_value() > 1e-5:
-            electron_precursors.add(precursor)
-    return electron_precursors     
+        nC = 0
+        for cs in carbon_source.split(','):
+            met = base.model.metabolites.get_by_id(cs + '_c')
+            nC += met.formula.elements['C']
+        uptake_rate = carbon_uptake_rate / float(nC)
 
-def analyze_rubisco_dependent():
+        for cs in carbon_source.split(','):
+            variant.set_exchange_bounds(cs, lower_bound=-uptake_rate)
     
-    target_reaction = 'RBC'
+    for ko in ko_list:
+        variant.knockout_reactions(ko)
+    return variant
+
+def get_producible_precursors(variant, precursors=BIOMASS_PRECURSORS):
+    """
+        returns the set of biomass precursors that the variant can produce
+    """
+    yields = variant.get_precursor_yields(precursors)
+    return set([p for p, y in yields.iteritems() if y is not None and y > 1e-5])
+
+def get_precursors(ko_list, energy_source='electrons', knockins='EDD,EDA,RBC,PRK',
+                   base=None, precursors=BIOMASS_PRECURSORS):
+    """
+        checks whether the model can produce at least one biomass precursor
+    """
+    if base is None:
+        base = create_base_model()
+    variant = generate_variant(base, ko_list, energy_source, BM_lower_bound=0, knockins=knockins)
+    return get_producible_precursors(variant, precursors)
+
+def analyze_combination(base, ko_list, carbon_source, electron_precursors,
+                        target_reaction='RBC'):
+    """
+        Checks whether a KO strain that has semi-autotrophic potential
+        (i.e. produces some electron_precursors) depends on the target reaction
+        when growing on the carbon source.
+        
+        Returns the row for the results csv file, or None if the strain cannot
+        grow or does not use the target reaction.
+    """
+    variant = generate_variant(base, ko_list, carbon_source)
+    biomass_yield = variant.solve_FBA() or np.nan
+    if np.isnan(biomass_yield):
+        return None
+    slope = OptKnock(variant.to_model()).get_slope(target_reaction)
+    if slope <= 0:
+        return None
+    
+    # if all biomass precursors can be generated using electrons this in an autotroph    
+    if electron_precursors == BIOMASS_PRECURSORS:
+        return ['autotroph', 
+                ';'.join(sorted(ko_list)), 
+                '', 
+                ';'.join(electron_precursors)]
     
+    # at least one elctron precursor is synthesized via "carbon-fixation", thus may be a semi
+    # remove RBC from model and grow on carbon to find BM precursors generated by carbon only
+    variant = generate_variant(base, ko_list, carbon_source, BM_lower_bound=0, knockins='EDD,EDA')
+    carbon_precursors = get_producible_precursors(variant)
+
+    trophism = 'potential'
+    if set(BIOMASS_PRECURSORS) - carbon_precursors <= electron_precursors:
+        trophism = 'semi-autotroph'
+    return [trophism, 
+            ';'.join(sorted(ko_list)), 
+            ';'.join(carbon_precursors), 
+            ';'.join(electron_precursors), 
+            carbon_source]
+
+# the base model of the current (worker) process
+_worker_base = None
+
+def _init_worker():
+    global _worker_base
+    _worker_base = create_base_model()
+
+def _electron_precursors_task(task):
+    ko_list, candidates = task
+    return get_precursors(ko_list, energy_source='electrons',
+                          base=_worker_base, precursors=candidates)
+
+def _analyze_task(task):
+    ko_list, carbon_source, electron_precursors = task
+    return analyze_combination(_worker_base, ko_list, carbon_source, electron_precursors)
+
+def analyze_rubisco_dependent(processes=1):
+    """
+        Screens all the combinations of up to NUMBER_OF_KNOCKOUTS knockouts
+        from single_ko_list, on each of the carbon sources.
+        
+        First, the KO strains with semi-autotrophic potential (i.e. that can
+        produce some precursors from electrons) are found by search_knockouts,
+        which never tests supersets of combinations that already lost all
+        their electron precursors. Then, each of these strains is analyzed on
+        every carbon source.
+        
+        With processes > 1, both steps are split across a pool of worker
+        processes, each with its own base model. The rows are written to
+        res/semi_autotrophic.csv as they arrive, always in the order of the
+        (ko_list, carbon_source) grid.
+    """
     print "There are %d single knockouts\n" % len(single_ko_list)
     print "There are %d carbon sources: %s\n" % (len(carbon_sources), ', '.join(carbon_sources))
     
-    csv_out = csv.writer(open('res/semi_autotrophic.csv', 'w'))
-    # csv header    
-    csv_out.writerow(['trophism', 
-                      'ko_list', 
-                      'unique_carbon_precursors', 
-                      'unique_electrons_precursors', 
-                      'carbon_source'])
-                      
-    for i in xrange(1, NUMBER_OF_KNOCKOUTS+1):
-        for ko_list in combinations(single_ko_list, i):            
-            print ko_list
-
-            electron_precursors = get_precursors(ko_list, energy_source='electrons')
-            # check if KO strain has the potential to be an autotroph
-            if electron_precursors:
-                trophism = 'potential'
-                print 'semi-autotrophic potential'
-                
-                for carbon_source in carbon_sources:
-                    temp_model = generate_model(ko_list, carbon_source)
-                    biomass_yield = OptKnock(temp_model).solve_FBA() or np.nan
-                    if np.isnan(biomass_yield):
-                        # find carbon source biomass precursors
-                        continue                        
-                    slope = OptKnock(temp_model).get_slope(target_reaction)
-                    if slope > 0:
-                        print slope
-                        # if all biomass precursors can be generated using electrons this in an autotroph    
-                        if electron_precursors == BIOMASS_PRECURSORS:
-                            trophism = 'autotroph'
-                            print "autotroph - not yuck!"
-                            carbon_precursors = []
-                            csv_out.writerow([trophism, 
-                                            ';'.join(sorted(ko_list)), 
-                                            ';'.join(carbon_precursors), 
-                                            ';'.join(electron_precursors)])
-                            break
-                        else: # at least one elctron precursor is synthesized via "carbon-fixation", thus may be a semi
-                            # remove RBC from model and grow on carbon to find BM precursors generated by carbon only
-                            temp_model = generate_model(ko_list, carbon_source, BM_lower_bound=0, knockins='EDD,EDA')
-                            carbon_precursors = set([])
-                            for precursor in BIOMASS_PRECURSORS:
-                                set_single_precursor_objective(temp_model, precursor)
-                                # Run the optimization for the objective reaction and medium composition set in the file.
-                                ok = OptKnock(temp_model)
-                                ok.prepare_FBA_primal()
-                                ok.solve()
-                                if ok.get_objective_value() > 1e-5:    
-                                    carbon_precursors.add(precursor)
-                                    print precursor
-    
-                            if set(BIOMASS_PRECURSORS) - carbon_precursors <= electron_precursors:
-                                trophism = 'semi-autotroph'
-                                print "this is a semi-autotroph! can grow noramlly on:\t", carbon_source
-                            csv_out.writerow([trophism, 
-                                            ';'.join(sorted(ko_list)), 
-                                            ';'.join(carbon_precursors), 
-                                            ';'.join(electron_precursors), 
-                                            carbon_source])
+    if processes > 1:
+        pool = multiprocessing.Pool(processes, initializer=_init_worker)
+        map_function = pool.imap
+    else:
+        pool = None
+        _init_worker()
+        map_function = imap
 
-                            
+    try:
+        potential = list(search_knockouts(single_ko_list, NUMBER_OF_KNOCKOUTS,
+                                          _electron_precursors_task,
+                                          BIOMASS_PRECURSORS, map_function))
+        print "There are %d KO strains with semi-autotrophic potential\n" % len(potential)
+    
+        tasks = ((ko_list, carbon_source, electron_precursors)
+                 for ko_list, electron_precursors in potential
+                 for carbon_source in carbon_sources)
+        rows = map_function(_analyze_task, tasks)
+    
+        with open('res/semi_autotrophic.csv', 'w') as fp:
+            csv_out = csv.writer(fp)
+            # csv header    
+            csv_out.writerow(['trophism', 
+                              'ko_list', 
+                              'unique_carbon_precursors', 
+                              'unique_electrons_precursors', 
+                              'carbon_source'])
+        
+            autotroph_ko_list = None
+            for row in rows:
+                if row is None:
+                    continue
+                if row[0] == 'autotroph':
+                    # an autotroph is reported only for the first carbon source
+                    if row[1] == autotroph_ko_list:
+                        continue
+                    autotroph_ko_list = row[1]
+                print ', '.join(row)
+                csv_out.writerow(row)
+                fp.flush()
+        if pool is not None:
+            pool.close()
+    except:
+        if pool is not None:
+            pool.terminate()
+        raise
+    finally:
+        if pool is not None:
+            pool.join()
 
 def main():
-    analyze_rubisco_dependent()
+    analyze_rubisco_dependent(processes=NUMBER_OF_PROCESSES)
     #print test_semi_potential('', '')
     return
     
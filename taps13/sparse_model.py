@@ -0,0 +1,108 @@
+import numpy as np
+import scipy.sparse
+
+class sparse_model(object):
+    """
+        A cobra model exported once into sparse matrices, so that graph
+        queries (producers, consumers, neighbors) become row and column
+        slices instead of scans over the reaction objects.
+
+        S           - the (metabolites x reactions) stoichiometric matrix (CSR)
+        consumption - boolean matrix, True where a reaction consumes a metabolite
+        production  - boolean matrix, True where a reaction produces a metabolite
+        dG          - the nominal values of a thermodynamic reaction attribute
+                      (e.g. dGm_prime, see thermodynamics_for_cobra), NaN
+                      where it is missing
+    """
+
+    def __init__(self, model, attribute='dGm_prime'):
+        self.metabolites = list(model.metabolites)
+        self.reactions = list(model.reactions)
+        self.metabolite_index = dict([(m.id, i) for i, m in enumerate(self.metabolites)])
+        self.reaction_index = dict([(r.id, j) for j, r in enumerate(self.reactions)])
+
+        rows, cols, vals = [], [], []
+        for j, r in enumerate(self.reactions):
+            for m, v in r.metabolites.iteritems():
+                rows.append(self.metabolite_index[m.id])
+                cols.append(j)
+                vals.append(v)
+        shape = (len(self.metabolites), len(self.reactions))
+        self.S = scipy.sparse.csr_matrix((vals, (rows, cols)), shape=shape)
+
+        # row slices (metabolite -> reactions) use the CSR matrices and
+        # column slices (reaction -> metabolites) use the CSC ones
+        self.consumption = (self.S < 0).tocsr()
+        self.production = (self.S > 0).tocsr()
+        self._consumption_csc = self.consumption.tocsc()
+        self._production_csc = self.production.tocsc()
+
+        self.dG = self.get_attribute(attribute)
+
+    def get_attribute(self, attribute):
+        """
+            Returns the nominal values of a reaction attribute as an array
+        """
+        values = [getattr(r, attribute, np.nan) for r in self.reactions]
+        return np.array([float(getattr(v, 'nominal_value', v)) for v in values])
+
+    def get_metabolite_mask(self, metabolite_ids):
+        mask = np.zeros(len(self.metabolites), dtype=bool)
+        for mid in metabolite_ids:
+            if mid in self.metabolite_index:
+                mask[self.metabolite_index[mid]] = True
+        return mask
+
+    def _index(self, metabolite):
+        if isinstance(metabolite, (int, long, np.integer)):
+            return metabolite
+        if isinstance(metabolite, basestring):
+            return self.metabolite_index[metabolite]
+        return self.metabolite_index[metabolite.id]
+
+    @staticmethod
+    def _slice(matrix, i):
+        return matrix.indices[matrix.indptr[i]:matrix.indptr[i+1]]
+
+    def consumers(self, metabolite):
+        """
+            Returns the indices of the reactions consuming the metabolite
+            (given as an index, an ID or a cobra Metabolite)
+        """
+        return self._slice(self.consumption, self._index(metabolite))
+
+    def producers(self, metabolite):
+        """
+            Returns the indices of the reactions producing the metabolite
+        """
+        return self._slice(self.production, self._index(metabolite))
+
+    def reactants(self, j):
+        """
+            Returns the indices of the reactants of reaction j
+        """
+        return self._slice(self._consumption_csc, j)
+
+    def products(self, j):
+        """
+            Returns the indices of the products of reaction j
+        """
+        return self._slice(self._production_csc, j)
+
+    def neighbors(self, i, reaction_mask=None):
+        """
+            Returns the indices of the products of all the reactions that
+            consume metabolite i (and are in the reaction mask)
+        """
+        reactions = self._slice(self.consumption, i)
+        if reaction_mask is not None:
+            reactions = reactions[reaction_mask[reactions]]
+        if len(reactions) == 0:
+            return reactions
+        return np.unique(self._production_csc[:, reactions].indices)
+
+    def get_reactions(self, indices):
+        return [self.reactions[j] for j in indices]
+
+    def get_metabolites(self, indices):
+        return [self.metabolites[i] for i in indices]
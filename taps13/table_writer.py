@@ -0,0 +1,68 @@
+import csv
+import os
+from itertools import islice
+
+def iter_chunks(rows, chunk_size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def write_table(rows, fname, header=None, chunk_size=10000):
+    """
+        Writes rows from any iterable (typically a generator producing them
+        as candidates are found) to a TSV file, or to a Parquet file if fname
+        ends with '.parquet'.
+
+        Only chunk_size rows are held in memory at a time, and every chunk is
+        flushed to the file before the next one is read, so all the rows
+        written before an interruption are kept.
+
+        The parent directory of fname is created if it does not exist.
+
+        Returns the number of rows written.
+    """
+    dirname = os.path.dirname(fname)
+    if dirname and not os.path.exists(dirname):
+        os.makedirs(dirname)
+
+    if fname.endswith('.parquet'):
+        return _write_parquet(rows, fname, header, chunk_size)
+
+    n_rows = 0
+    with open(fname, 'w') as fp:
+        writer = csv.writer(fp, delimiter='\t', lineterminator='\n')
+        if header is not None:
+            writer.writerow(header)
+        for chunk in iter_chunks(rows, chunk_size):
+            writer.writerows(chunk)
+            fp.flush()
+            n_rows += len(chunk)
+    return n_rows
+
+def _write_parquet(rows, fname, header, chunk_size):
+    # pyarrow is only needed for Parquet output
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    n_rows = 0
+    writer = None
+    try:
+        for chunk in iter_chunks(rows, chunk_size):
+            if header is None:
+                header = ['c%d' % i for i in xrange(len(chunk[0]))]
+            columns = [pa.array(list(col)) for col in zip(*chunk)]
+            table = pa.Table.from_arrays(columns, names=header)
+            if writer is None:
+                writer = pq.ParquetWriter(fname, table.schema)
+            # every chunk becomes a row group of its own
+            writer.write_table(table)
+            n_rows += len(chunk)
+    finally:
+        # closing writes the footer, which keeps the file readable even when
+        # the rows generator is interrupted
+        if writer is not None:
+            writer.close()
+    return n_rows
@@ -1,37 +1,176 @@
+import os, hashlib
 import numpy as np
+import scipy.sparse
 import uncertainties.unumpy as unumpy  
 from cobra.io.sbml import create_cobra_model_from_sbml_file
 from component_contribution.kegg_model import KeggModel
 from component_contribution.component_contribution_trainer import ComponentContribution
 from component_contribution.thermodynamic_constants import R, default_T
 
+# the transformed dG0 of every set of reactions (and their uncertainties) are
+# cached here, per pH, ionic strength and temperature
+THERMO_CACHE_DIR = 'cache'
+
+# the trained component-contribution data, loaded only when the transformed
+# dG0 of a set of reactions is not found in THERMO_CACHE_DIR
+_cc = None
+
+def get_component_contribution():
+    global _cc
+    if _cc is None:
+        _cc = ComponentContribution.init()
+    return _cc
+
+def stoichiometric_matrix(reactions):
+    """
+        Returns the (metabolites x reactions) stoichiometric matrix of cobra
+        reactions as a sparse matrix, and the list of metabolites
+    """
+    metabolites = {}
+    rows, cols, vals = [], [], []
+    for j, r in enumerate(reactions):
+        for m, v in r.metabolites.iteritems():
+            rows.append(metabolites.setdefault(m, len(metabolites)))
+            cols.append(j)
+            vals.append(v)
+    S = scipy.sparse.csc_matrix((vals, (rows, cols)),
+                                shape=(len(metabolites), len(reactions)))
+    return S, sorted(metabolites, key=metabolites.get)
+
 class reaction_thermodynamics(object):
 
     def __init__(self, reactions):
 
-        self.cc = ComponentContribution.init()
         self.pH = 7.5
         self.I = 0.2
         self.T = default_T
         self.R = R
         self._not_balanced = []
         self.reactions = []    
+        self._rstrings = []
+        self._has_thermo = False
         self.Kmodel = self.generate_kegg_model(reactions)
         self.dG0_prime = self.add_thermodynamics(reactions)
         
+    @property
+    def cc(self):
+        return get_component_contribution()
+        
     def generate_kegg_model(self, reactions):
         
-        rstrings = []
         for r in reactions:
             k = r.kegg_reaction
             if k:
                 if k.is_balanced() and not k.is_empty():
-                    rstrings.append(k.write_formula())
+                    self._rstrings.append(k.write_formula())
                     self.reactions.append(r)
             else:
                 self._not_balanced.append(r)
-        return KeggModel.from_formulas(rstrings)
+        return KeggModel.from_formulas(self._rstrings)
+        
+    def _cache_fname(self, pH, I, T):
+        sha = hashlib.sha1()
+        for rstring in self._rstrings:
+            sha.update(rstring + '\n')
+        return os.path.join(THERMO_CACHE_DIR, 'dG0_%s_pH%g_I%g_T%g.npz' %
+                            (sha.hexdigest(), pH, I, T))
+        
+    def get_transformed_dG0(self, pH, I, T):
+        """
+            Returns the transformed dG0 of all the reactions and their
+            uncertainties. The results are cached in THERMO_CACHE_DIR, so the
+            component-contribution data is loaded (and added to the KEGG
+            model) only for conditions that were never calculated before.
+        """
+        fname = self._cache_fname(pH, I, T)
+        if os.path.exists(fname):
+            cached = np.load(fname)
+            return cached['dG0_prime'], cached['dG0_cov']
+        
+        if not self._has_thermo:
+            self.Kmodel.add_thermo(self.cc)
+            self._has_thermo = True
+        # also returns the sqrt-covariance, which is not used here
+        res = self.Kmodel.get_transformed_dG0(pH=pH, I=I, T=T)
+        dG0_prime, dG0_cov = res[0], res[1]
+        dG0_prime, dG0_cov = np.asarray(dG0_prime), np.asarray(dG0_cov)
         
+        if not os.path.exists(THERMO_CACHE_DIR):
+            os.makedirs(THERMO_CACHE_DIR)
+        tmp_fname = '%s.%d.npz' % (fname[:-4], os.getpid())
+        np.savez(tmp_fname, dG0_prime=dG0_prime, dG0_cov=dG0_cov)
+        os.rename(tmp_fname, fname)
+        return dG0_prime, dG0_cov
+        
+    def default_concentrations(self):
+        """
+            1 mM for all compounds, except for water (1 M)
+        """
+        conc = np.ones((1, len(self.Kmodel.cids))) * 1e-3 # concentrations in M
+        if 'C00001' in self.Kmodel.cids:
+            j= self.Kmodel.cids.index('C00001')
+            conc[0, j] = 1
+        return conc
+
+    def get_concentrations(self, concentrations):
+        """
+            Converts a list of dictionaries, mapping KEGG compound IDs to
+            concentrations (in M), into a (len(concentrations) x compounds)
+            array. Compounds missing from a dictionary are kept at their
+            default concentration. Raises KeyError for a KEGG ID that is not
+            in the model.
+        """
+        conc = np.repeat(self.default_concentrations(), len(concentrations), axis=0)
+        cid_index = dict([(cid, j) for j, cid in enumerate(self.Kmodel.cids)])
+        for i, c in enumerate(concentrations):
+            for cid, val in c.iteritems():
+                if cid not in cid_index:
+                    raise KeyError('the compound %s is not in the model' % cid)
+                conc[i, cid_index[cid]] = val
+        return conc
+
+    def sweep(self, pH_values, I_values, concentrations=None):
+        """
+            Calculates dG'0 and dG'm of all the reactions over a grid of pH
+            values, ionic strengths and concentration vectors (see
+            get_concentrations), where the default is 1 mM for all compounds.
+
+            The transformed dG0 of each (pH, I) pair comes from the same
+            trained component-contribution data (and is cached on disk), and
+            the concentrations are applied to all of them at once.
+
+            Returns a tuple (conditions, dG0_prime, dGm_prime, dG_std):
+                conditions - a list of (pH, I, concentration index) tuples
+                dG0_prime, dGm_prime, dG_std - arrays of shape
+                    (conditions x reactions), where dG_std is the uncertainty
+                    of both dG'0 and dG'm
+        """
+        if concentrations is None:
+            concentrations = [{}]
+        log_conc = np.log(self.get_concentrations(concentrations))
+        dG_conc = self.R * self.T * np.dot(log_conc, np.asarray(self.Kmodel.S))
+
+        dG0_prime, dG_std = [], []
+        for pH in pH_values:
+            for I in I_values:
+                dG0, dG0_cov = self.get_transformed_dG0(pH=pH, I=I, T=self.T)
+                dG0_prime.append(dG0.flatten())
+                dG_std.append(1.96*(dG0_cov.round(1)).flatten())
+        dG0_prime = np.array(dG0_prime)
+        dG_std = np.array(dG_std)
+
+        # (pH, I) x concentrations x reactions
+        dGm_prime = dG0_prime[:, np.newaxis, :] + dG_conc[np.newaxis, :, :]
+
+        n_reactions = len(self.reactions)
+        n_conc = len(concentrations)
+        conditions = [(pH, I, k) for pH in pH_values for I in I_values
+                      for k in xrange(n_conc)]
+        return (conditions,
+                np.repeat(dG0_prime, n_conc, axis=0),
+                dGm_prime.reshape(-1, n_reactions),
+                np.repeat(dG_std, n_conc, axis=0))
+
     def add_thermodynamics(self, reactions):
         '''
             Calculates the dG0 of a list of a reaction.
@@ -46,39 +185,38 @@ class reaction_thermodynamics(object):
             A convenient threshold for reversibility is RI>=1000, that is a change of
             1000% in metabolite concentrations is required in ordeer to flip the
             reaction direction. 
+            
+            All the values are calculated as arrays over all the reactions,
+            and then assigned to the reactions as attributes.
         '''
         
-        self.Kmodel.add_thermo(self.cc)
-        
-        temp = self.Kmodel.get_transformed_dG0(pH=self.pH, I=self.I, T=298.15)
+        dG0_prime, dG0_cov = self.get_transformed_dG0(pH=self.pH, I=self.I, T=self.T)
 
-        dG0_prime, dG0_cov = temp[0], temp[1]
         dG0_std = 1.96*(dG0_cov.round(1))
         dG0_prime = unumpy.uarray(dG0_prime.flat, dG0_std.flat)
         
-        conc = np.ones((1, len(self.Kmodel.cids))) * 1e-3 # concentrations in M
-        if 'C00001' in self.Kmodel.cids:
-            j= self.Kmodel.cids.index('C00001')
-            conc[0, j] = 1
-        dGm_prime = dG0_prime + self.R * self.T * np.log(conc) * self.Kmodel.S
+        conc = self.default_concentrations()
+        dGm_prime = dG0_prime + self.R * self.T * np.dot(np.log(conc), np.asarray(self.Kmodel.S))
+        self.dGm_prime = dGm_prime[0, :]
+        
+        # equilibrium constant
+        nominal = unumpy.nominal_values(dG0_prime)
+        tmp = np.where(nominal > 200, 200, np.where(nominal < -200, -200, dG0_prime))
+        self.logKeq = -tmp / (self.R * self.T)
+        
+        # reversibility index
+        S, _ = stoichiometric_matrix(self.reactions)
+        N_P = np.asarray(S.maximum(0).sum(axis=0)).flatten()
+        N_S = np.asarray((-S).maximum(0).sum(axis=0)).flatten()
+        N = N_P + N_S
+        fixed_conc=0.1                
+        self.logRI = (2/N) * (self.logKeq + (N_P - N_S)*np.log(fixed_conc))
         
         for i, r in enumerate(self.reactions):
-            # d0_prime
             r.dG0_prime = dG0_prime[i]
-            # dGm_prime
-            r.dGm_prime = dGm_prime[0,i]  
-            
-            # equilibrium constant
-            tmp = r.dG0_prime
-            if tmp > 200: tmp = 200
-            if tmp < -200: tmp = -200
-            r.logKeq = -tmp / (self.R * self.T)
-            # reversibility index
-            N_P = sum([v  for v in r.metabolites.itervalues() if v > 0])
-            N_S = sum([-v for v in r.metabolites.itervalues() if v < 0])
-            N = N_P + N_S
-            fixed_conc=0.1                
-            r.logRI = (2/N) * (r.logKeq + (N_P - N_S)*np.log(fixed_conc))        
+            r.dGm_prime = self.dGm_prime[i]
+            r.logKeq = self.logKeq[i]
+            r.logRI = self.logRI[i]
 
         for r in set(reactions) - set(self.reactions):
             r.dG0_prime = np.NaN